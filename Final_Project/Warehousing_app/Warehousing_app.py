@@ -1,16 +1,30 @@
 # Some parts were completed using artificial 
 # intelligence, and in front of that part it says "AI".
+import argparse
+import bisect
 import csv
+import functools
+import gc
+import inspect
+import itertools
 import json
 import logging
+import math
 import os
+import queue
+import shutil
 import threading
-from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future
+from datetime import date, datetime, timedelta
+from enum import Enum
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
 import tkinter as tk
-from tkinter import filedialog, messagebox, ttk
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill
+from tkinter import filedialog, messagebox, simpledialog, ttk
 
 # ------------------------- Logging Configuration -------------------------
 # Setup basic logging to track events and debug issues
@@ -22,110 +36,293 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))  # Directory where the s
 SOUND_FILENAME = "clicked.wav"  # Default click sound file
 SOUND_PATH = os.path.join(SCRIPT_DIR, SOUND_FILENAME)
 
-_sound_play_fn = None 
-
 # ------------------------- Sound Playback Setup -------------------------
-# Attempt to import platform-specific or third-party sound playback libraries
+# Platform-specific or third-party sound playback libraries. Each loader
+# reads or decodes the WAV file once and returns a function that plays the
+# cached sound, blocking until it is done. Tried in order: winsound
+# (Windows built-in), simpleaudio (cross-platform), playsound.
 
-# ------------------------- Sound Playback Setup -------------------------
-# Attempt to import platform-specific or third-party sound playback libraries.
-# This ensures that a click sound can be played asynchronously, depending on
-# which library is available on the system.
 
-try:
-    import winsound  # Windows built-in library for playing sounds
+def _winsound_loader(path: str) -> Callable[[], None]:
+    """
+    Load a WAV file into memory for the built-in Windows winsound library.
 
-    def _winsound_play(path: str):
-        """
-        Play a WAV file using the built-in Windows winsound library asynchronously.
-        
-        Args:
-            path (str): Full path to the WAV file to be played.
-        """
-        winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC)
+    Args:
+        path (str): Full path to the WAV file to be played.
+    """
+    import winsound
+    with open(path, "rb") as f:
+        data = f.read()
+    # winsound cannot play a memory image asynchronously; the audio worker thread waits instead
+    return lambda: winsound.PlaySound(data, winsound.SND_MEMORY)
 
-    _sound_play_fn = _winsound_play  # Assign the function pointer
-    logger.debug("Using winsound for click sounds")
-except Exception:
-    logger.debug("winsound not available")
 
-# If winsound is not available, try using simpleaudio (cross-platform)
-if _sound_play_fn is None:
-    try:
-        import simpleaudio as sa
+def _simpleaudio_loader(path: str) -> Callable[[], None]:
+    """
+    Decode a WAV file once for the simpleaudio library.
 
-        def _simpleaudio_play(path: str):
-            """
-            Play a WAV file using the simpleaudio library.
+    Args:
+        path (str): Full path to the WAV file to be played.
+    """
+    import simpleaudio as sa
+    wave_obj = sa.WaveObject.from_wave_file(path)
+    return lambda: wave_obj.play().wait_done()
 
-            Args:
-                path (str): Full path to the WAV file to be played.
-            """
-            wave_obj = sa.WaveObject.from_wave_file(path)
-            wave_obj.play()  # This starts playback asynchronously
 
-        _sound_play_fn = _simpleaudio_play
-        logger.debug("Using simpleaudio for click sounds")
-    except Exception:
-        logger.debug("simpleaudio not available")
+def _playsound_loader(path: str) -> Callable[[], None]:
+    """
+    Prepare the playsound library (blocking call, reads the file itself).
 
-# If neither winsound nor simpleaudio is available, fallback to playsound
-if _sound_play_fn is None:
-    try:
-        from playsound import playsound
+    Args:
+        path (str): Full path to the WAV file to be played.
+    """
+    from playsound import playsound
+    return lambda: playsound(path)
 
-        def _playsound_play(path: str):
-            """
-            Play a WAV file using the playsound library (blocking call).
 
-            Args:
-                path (str): Full path to the WAV file to be played.
-            """
-            playsound(path)
+class ClickSoundPlayer:  # "AI"
+    """
+    Plays the click sound on one long-lived audio worker thread.
 
-        def _playsound_async(path: str):
-            """
-            Play a WAV file asynchronously in a separate thread using playsound.
+    The sound library is picked and the WAV file decoded once, on the
+    worker, the first time a click is played. Clicks wait in a bounded
+    queue; when clicks arrive faster than they can be played (bursty
+    scanner input) the extra ones are dropped instead of piling up
+    threads and disk reads.
+    """
 
-            Args:
-                path (str): Full path to the WAV file to be played.
-            """
-            threading.Thread(target=_playsound_play, args=(path,), daemon=True).start()
+    LOADERS = (("winsound", _winsound_loader), ("simpleaudio", _simpleaudio_loader), ("playsound", _playsound_loader))
 
-        _sound_play_fn = _playsound_async
-        logger.debug("Using playsound for click sounds")
-    except Exception:
-        logger.debug("playsound not available")
+    def __init__(self, path: str, max_pending: int = 1):
+        """
+        path: WAV file to play
+        max_pending: Clicks allowed to wait while one is playing
+        """
+        self.path = path
+        self.available = True        # False once no library or sound file was found
+        self.dropped = 0             # Clicks skipped because the queue was full
+        self._pending: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def play(self) -> None:
+        """Queue a click without blocking; drop it if the worker is busy."""
+        if not self.available:
+            return
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="click-sound", daemon=True)
+                    self._thread.start()
+        try:
+            self._pending.put_nowait(None)
+        except queue.Full:
+            self.dropped += 1
+
+    def _load(self) -> Optional[Callable[[], None]]:
+        """Return a function playing the cached sound, or None if no library works."""
+        if not os.path.isfile(self.path):
+            return None
+        for module, loader in self.LOADERS:
+            try:
+                play = loader(self.path)
+            except Exception as exc:
+                logger.debug("%s not available: %s", module, exc)
+                continue
+            logger.debug("Using %s for click sounds", module)
+            return play
+        return None
+
+    def _run(self) -> None:
+        """Worker loop: play one queued click at a time."""
+        play = self._load()
+        if play is None:
+            self.available = False
+            return
+        while True:
+            self._pending.get()
+            try:
+                play()
+            except Exception as exc:
+                logger.debug("Failed to play sound: %s", exc)
 
 
+_click_player = ClickSoundPlayer(SOUND_PATH)
+
 
 def play_click_sound_async() -> None:  # "AI"
     """
     Play a click sound asynchronously if available.
-    
-    This function attempts to play a click sound in a non-blocking way.
-    It checks if the sound file exists and if a playback function is available.
+
+    Hands the click to the shared audio worker and returns at once.
     Any errors during playback are logged for debugging but do not raise exceptions,
     ensuring that sound failures do not interrupt program execution.
     """
-    # If the sound file does not exist or no sound function is available, do nothing
-    if not os.path.isfile(SOUND_PATH) or _sound_play_fn is None:
-        return
+    _click_player.play()
+
+
+# ------------------------- Instrumentation -------------------------
+class LatencyHistogram:
+    """Call count and latency histogram of one operation, in power-of-two microsecond buckets."""
+
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets: List[int] = [0] * 40  # buckets[i]: calls that took under 2**i microseconds
+
+    def add(self, seconds: float) -> None:
+        """Count one call that took the given number of seconds."""
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.buckets[min(int(seconds * 1e6).bit_length(), len(self.buckets) - 1)] += 1
+
+    def percentile(self, p: float) -> float:
+        """Return an upper bound in seconds for the p-th percentile latency (0-100)."""
+        if not self.count:
+            return 0.0
+        rank = math.ceil(self.count * p / 100)
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(2 ** i / 1e6, self.max)
+        return self.max
+
+
+class Instrumentation:
+    """
+    Opt-in timing of Inventory methods and GUI handlers.
+
+    instrument() swaps the named methods of one object for timed
+    wrappers, so nothing is slowed down unless instrumentation is
+    switched on (--instrument). Every call lands in a per-operation
+    latency histogram; Inventory.save also counts the bytes it wrote.
+    Summaries go to a rotating log file and the GUI's performance panel.
+    """
+
+    GUI_HANDLERS = ("refresh_products_table", "_render_rows", "_show_selected", "_on_inventory_change")
 
-    def worker():
+    def __init__(self, log_path: Optional[str] = None, max_bytes: int = 1_000_000, backups: int = 3):
         """
-        Worker thread to handle the asynchronous playback.
-        Encapsulates the call to the platform-specific sound function
-        and logs any exceptions without crashing the program.
+        log_path: Rotating log file for summaries (defaults to warehouse_perf.log next to this script)
+        max_bytes: Size at which the log is rotated
+        backups: Number of rotated logs kept
         """
-        try:
-            _sound_play_fn(SOUND_PATH)  # Call the assigned sound playback function
-        except Exception as exc:
-            logger.debug("Failed to play sound: %s", exc)
-
-    # Start the playback in a daemon thread so it runs asynchronously
-    threading.Thread(target=worker, daemon=True).start()
+        import logging.handlers
+
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.save_bytes = 0   # Bytes written by all instrumented saves
+        self.saves = 0
+        self._lock = threading.Lock()  # Imports and exports report from worker threads
+        self.log_path = log_path if log_path else os.path.join(SCRIPT_DIR, "warehouse_perf.log")
+        self.log = logging.getLogger("warehouse.perf")
+        self.log.propagate = False
+        if not self.log.handlers:
+            handler = logging.handlers.RotatingFileHandler(self.log_path, maxBytes=max_bytes, backupCount=backups)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self.log.addHandler(handler)
+            self.log.setLevel(logging.INFO)
+
+    def record(self, name: str, seconds: float) -> None:
+        """Add one timed call of an operation."""
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = LatencyHistogram()
+            hist.add(seconds)
+
+    def instrument(self, obj: object, names: Iterable[str], prefix: str) -> None:
+        """
+        Time the named methods of obj from now on.
 
+        Generator methods (CSV parsing) are timed over their whole run,
+        counting only the time spent producing items.
+        """
+        for name in names:
+            method = getattr(obj, name)
+            label = prefix + name
+            if inspect.isgeneratorfunction(method):
+                setattr(obj, name, self._timed_generator(method, label))
+            else:
+                setattr(obj, name, self._timed(method, label))
+
+    def _timed(self, method: Callable, label: str) -> Callable:
+        """Wrap a method so each call is recorded under label."""
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.record(label, time.perf_counter() - start)
+        return timed
+
+    def _timed_generator(self, method: Callable, label: str) -> Callable:
+        """Wrap a generator method so the time spent inside it is recorded once it finishes."""
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            it = method(*args, **kwargs)
+            spent = 0.0
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        item = next(it)
+                    except StopIteration:
+                        return
+                    finally:
+                        spent += time.perf_counter() - start
+                    yield item
+            finally:
+                self.record(label, spent)
+        return timed
+
+    def instrument_inventory(self, inventory: "Inventory") -> None:
+        """Time every public Inventory method and count the bytes each save writes."""
+        names = [
+            name for name in dir(type(inventory))
+            if not name.startswith("_") and callable(getattr(inventory, name))
+        ]
+        self.instrument(inventory, names, "Inventory.")
+        timed_save = inventory.save
+
+        @functools.wraps(timed_save)
+        def save():
+            ok = timed_save()
+            if ok:
+                with self._lock:
+                    self.saves += 1
+                    self.save_bytes += inventory.last_save_bytes
+            return ok
+        inventory.save = save
+
+    def instrument_app(self, app: object) -> None:
+        """Time the GUI's on_* handlers and table/detail rendering; call before the widgets are built."""
+        names = [name for name in dir(type(app)) if name.startswith("on_")]
+        self.instrument(app, names + list(self.GUI_HANDLERS), "GUI.")
+
+    def summary(self) -> List[Tuple[str, int, float, float, float]]:
+        """Return (operation, calls, p50, p99, max) rows, slowest total time first; times in seconds."""
+        with self._lock:
+            items = sorted(self.histograms.items(), key=lambda item: item[1].total, reverse=True)
+            return [(name, h.count, h.percentile(50), h.percentile(99), h.max) for name, h in items]
+
+    def report(self) -> str:
+        """Format the summary as a text table."""
+        lines = [f"{'operation':<40} {'calls':>8} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+        for name, count, p50, p99, worst in self.summary():
+            lines.append(f"{name:<40} {count:>8} {p50 * 1e3:>9.2f} {p99 * 1e3:>9.2f} {worst * 1e3:>9.2f}")
+        average = self.save_bytes / self.saves if self.saves else 0
+        lines.append(f"saves: {self.saves}, bytes written: {self.save_bytes} ({average:.0f} per save)")
+        return "\n".join(lines)
+
+    def write_log(self) -> None:
+        """Append the current summary to the rotating log."""
+        self.log.info("latency summary\n%s", self.report())
 
 
 # ------------------------- Product Class -------------------------
@@ -146,20 +343,37 @@ class Product:
         self.name: str = name.lower()  # Normalize name to lowercase
         self.quantity: int = int(quantity)
         self.transactions: List[Dict] = []  # Stores all actions with timestamps
+        self.history_loaded: bool = True     # False while only the quantity is known (fast start)
         self._record("initial", self.quantity)  # Record initial stock
 
-    def _record(self, action: str, qty: int) -> None:
+    @classmethod
+    def restore(cls, name: str, quantity: int, transactions: Optional[List[Dict]]) -> "Product":
+        """
+        Rebuild a saved product without recording a new 'initial' transaction.
+
+        transactions: Saved history, or None if it has not been loaded yet
+        """
+        p = cls.__new__(cls)
+        p.name = name.lower()
+        p.quantity = int(quantity)
+        p.transactions = transactions if transactions is not None else []
+        p.history_loaded = transactions is not None
+        return p
+
+    def _record(self, action: str, qty: int, **extra) -> None:
         """
         Record a transaction in the product's history.
         
         action: Type of operation ('add', 'sell', 'initial', etc.)
         qty: Quantity affected by this action
+        extra: Additional fields stored with the entry (e.g. a transfer reference)
         """
         self.transactions.append(
             {
                 "action": action,
                 "quantity": int(qty),
                 "datetime": datetime.now().isoformat(timespec="seconds"),
+                **extra,
             }
         )
 
@@ -198,6 +412,570 @@ class Product:
         self._record("initial_replace", qty)
 
 
+def running_stock(transactions: Iterable[Dict]) -> Iterator[Tuple[Dict, int]]:
+    """
+    Walk a product's transaction history and track the stock level.
+
+    'summary' entries (see Inventory.compact_history) carry the closing
+    balance of the period they replace in their 'quantity'.
+
+    Yields (entry, stock_after) for every transaction entry.
+    """
+    current = 0
+    for entry in transactions:
+        act = entry.get("action")
+        qty = entry.get("quantity")
+        if act in ("initial", "initial_replace", "summary"):
+            current = qty
+        elif act in ("add", "undo_sell", "transfer_in"):
+            current += qty
+        elif act in ("sell", "undo_add", "transfer_out"):
+            current -= qty
+        yield entry, current
+
+
+# ------------------------- Search Index -------------------------
+class SearchIndex:
+    """
+    Name index behind the search box.
+
+    Keeps a sorted array of product names for prefix lookups and a trigram
+    inverted index for substring lookups, so a query only touches names
+    that can actually match it instead of scanning the whole catalog.
+    The trigram postings are built on the first substring query, so a
+    (re)load only pays for sorting the names.
+    """
+
+    FUZZY_MIN_SCORE = 0.3  # Minimum trigram similarity for a fuzzy match
+    RANK_LIMIT = 5000      # Larger result sets are listed alphabetically instead of ranked
+
+    def __init__(self, names: Iterable[str] = ()):
+        """
+        Build the index.
+
+        names: Initial product names (already lowercase)
+        """
+        self.names: List[str] = []              # Sorted array of all names
+        self.trigrams: Optional[Dict[str, Set[str]]] = None  # Trigram -> names; None until first needed
+        self.rebuild(names)
+
+    @staticmethod
+    def _grams(text: str) -> Set[str]:
+        """Return the set of 3-character substrings of text."""
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def rebuild(self, names: Iterable[str]) -> None:
+        """Discard the index and start again from names."""
+        names = sorted(names)
+        if names == self.names:
+            return  # Same catalog (e.g. a reload): keep the postings
+        self.names = names
+        self.trigrams = None
+
+    def _postings(self) -> Dict[str, Set[str]]:
+        """Return the trigram postings, building them on first use."""
+        if self.trigrams is None:
+            self.trigrams = {}
+            for name in self.names:
+                self._index(name)
+        return self.trigrams
+
+    def _index(self, name: str) -> None:
+        """Add a name to the trigram postings."""
+        for g in self._grams(name):
+            self.trigrams.setdefault(g, set()).add(name)
+
+    def add(self, name: str) -> None:
+        """Insert a new name into the sorted array and the trigram postings."""
+        i = bisect.bisect_left(self.names, name)
+        if i < len(self.names) and self.names[i] == name:
+            return
+        self.names.insert(i, name)
+        if self.trigrams is not None:
+            self._index(name)
+
+    def remove(self, name: str) -> None:
+        """Remove a name from the sorted array and the trigram postings."""
+        i = bisect.bisect_left(self.names, name)
+        if i == len(self.names) or self.names[i] != name:
+            return
+        del self.names[i]
+        if self.trigrams is None:
+            return
+        for g in self._grams(name):
+            posting = self.trigrams.get(g)
+            if posting is not None:
+                posting.discard(name)
+                if not posting:
+                    del self.trigrams[g]
+
+    def prefix(self, prefix: str) -> List[str]:
+        """Return the names starting with prefix, in sorted order."""
+        lo = bisect.bisect_left(self.names, prefix)
+        hi = bisect.bisect_left(self.names, prefix + chr(0x10FFFF), lo)
+        return self.names[lo:hi]
+
+    def substring(self, query: str) -> Set[str]:
+        """Return the names containing query anywhere."""
+        if len(query) >= 3:
+            # Intersect the postings of every trigram in the query, smallest first
+            postings = self._postings()
+            grams = sorted(self._grams(query), key=lambda g: len(postings.get(g, ())))
+            result = set(postings.get(grams[0], ()))
+            for g in grams[1:]:
+                if not result:
+                    break
+                result &= postings.get(g, set())
+            return {name for name in result if query in name}
+        # Too short for a trigram; such queries match a large share of the catalog anyway,
+        # and one C-level scan of the sorted array beats unioning many big postings
+        return {name for name in self.names if query in name}
+
+    def fuzzy(self, query: str, limit: int = 50) -> List[str]:
+        """Return up to limit names ranked by trigram similarity to query."""
+        grams = self._grams(query)
+        if not grams:
+            return []
+        shared: Dict[str, int] = {}
+        for g in grams:
+            for name in self._postings().get(g, ()):
+                shared[name] = shared.get(name, 0) + 1
+        scored = []
+        for name, count in shared.items():
+            score = count / len(grams)  # Share of the query's trigrams found in name
+            if score >= self.FUZZY_MIN_SCORE:
+                scored.append((-score, len(name), name))  # Prefer shorter names on ties
+        scored.sort()
+        return [name for _, _, name in scored[:limit]]
+
+    def search(self, query: str) -> List[str]:
+        """
+        Return the names matching query, best matches first.
+
+        Ranking: exact match, then prefix matches, then matches at the
+        start of a word, then any other substring match. When nothing
+        contains the query, fall back to fuzzy trigram matches. Very
+        large result sets keep alphabetical order after the prefix matches.
+        """
+        query = query.strip().lower()
+        if not query:
+            return list(self.names)
+        # The prefix slice is already sorted, and an exact match sorts first within it
+        starts = self.prefix(query)
+        if len(query) < 3:
+            # Short queries match much of the catalog: keep the rest alphabetical in one pass
+            return starts + [name for name in self.names if query in name and not name.startswith(query)]
+        others = self.substring(query).difference(starts)
+        if not starts and not others:
+            return self.fuzzy(query)
+        if len(others) > self.RANK_LIMIT:
+            return starts + sorted(others)
+        word = " " + query
+        return starts + sorted(others, key=lambda name: (word not in name, name.find(query), name))
+
+
+# ------------------------- Undo History -------------------------
+class UndoHistory:
+    """
+    Bounded undo/redo stacks for Inventory.
+
+    Keeps at most max_entries undo entries and max_ops operation records
+    in total (a batched import counts one record per row), dropping the
+    oldest entries first. Consecutive add or sell operations on the same
+    product within coalesce_seconds of each other are merged into one entry.
+    When dropped or discarded entries referred to the removal journal,
+    on_drop (if set) is called once the operation is recorded.
+    """
+
+    def __init__(self, max_entries: int = 500, max_ops: int = 200_000, coalesce_seconds: float = 5.0):
+        """
+        Create empty stacks.
+
+        max_entries: Maximum number of undo entries kept
+        max_ops: Maximum number of operation records kept across all entries
+        coalesce_seconds: Time window for merging repeated add/sell operations
+        """
+        self.max_entries = max_entries
+        self.max_ops = max_ops
+        self.coalesce_seconds = coalesce_seconds
+        self.undo_stack: Deque[Dict] = deque()  # Oldest entry on the left
+        self.redo_stack: List[Dict] = []
+        self._ops = 0                            # Operation records held by undo_stack
+        self.on_drop: Optional[Callable[[], None]] = None
+        self._dropped_journal = False            # A dropped entry referred to the journal
+
+    @staticmethod
+    def _journal_offsets(op: Dict) -> Iterator[int]:
+        """Removal journal offsets an entry refers to."""
+        if op.get("op") == "remove_product":
+            yield op["offset"]
+        elif op.get("op") == "batch":
+            for sub in op["ops"]:
+                if sub.get("op") == "remove_product":
+                    yield sub["offset"]
+
+    def oldest_offset(self) -> Optional[int]:
+        """Smallest removal journal offset still referred to by an undo or redo entry."""
+        return min(
+            (offset for stack in (self.undo_stack, self.redo_stack) for op in stack for offset in self._journal_offsets(op)),
+            default=None,
+        )
+
+    def _forget(self, op: Dict) -> None:
+        """Note that an entry is gone for good."""
+        if not self._dropped_journal and next(self._journal_offsets(op), None) is not None:
+            self._dropped_journal = True
+
+    def _report_drop(self) -> None:
+        """Call on_drop if entries referring to the journal were dropped."""
+        if self._dropped_journal:
+            self._dropped_journal = False
+            if self.on_drop is not None:
+                self.on_drop()
+
+    @staticmethod
+    def _size(op: Dict) -> int:
+        """Number of operation records in an entry."""
+        return len(op["ops"]) if op.get("op") == "batch" else 1
+
+    def push(self, op: Dict) -> None:
+        """Record a new operation; this forgets the redo history."""
+        for dropped in self.redo_stack:
+            self._forget(dropped)
+        self.redo_stack.clear()
+        if not self._coalesce(op):
+            self._append(op)
+        self._report_drop()
+
+    def _coalesce(self, op: Dict) -> bool:
+        """Merge op into the newest entry if both change the same product the same way."""
+        if op.get("op") not in ("add", "sell") or not self.undo_stack:
+            return False
+        top = self.undo_stack[-1]
+        if top.get("op") != op["op"] or top.get("name") != op["name"]:
+            return False
+        if op.get("ts", 0) - top.get("ts", 0) > self.coalesce_seconds:
+            return False
+        top["qty"] += op["qty"]  # "prev" stays the quantity before the first merged operation
+        top["ts"] = op.get("ts", 0)
+        return True
+
+    def _append(self, op: Dict) -> None:
+        """Add an entry to the undo stack and drop the oldest entries over the limits."""
+        self.undo_stack.append(op)
+        self._ops += self._size(op)
+        while self.undo_stack and (len(self.undo_stack) > self.max_entries or self._ops > self.max_ops):
+            dropped = self.undo_stack.popleft()
+            self._ops -= self._size(dropped)
+            self._forget(dropped)
+            if dropped is op:
+                logger.info("Operation too large to keep in undo history (%d records)", self._size(op))
+
+    def pop_undo(self) -> Optional[Dict]:
+        """Take the newest undo entry, or None if there is nothing to undo."""
+        if not self.undo_stack:
+            return None
+        op = self.undo_stack.pop()
+        self._ops -= self._size(op)
+        return op
+
+    def pop_redo(self) -> Optional[Dict]:
+        """Take the newest redo entry, or None if there is nothing to redo."""
+        return self.redo_stack.pop() if self.redo_stack else None
+
+    def undone(self, op: Dict) -> None:
+        """Make an undone entry available for redo."""
+        self.redo_stack.append(op)
+
+    def redone(self, op: Dict) -> None:
+        """Put a redone entry back on the undo stack, keeping the rest of the redo history."""
+        self._append(op)
+        self._report_drop()
+
+    def clear(self) -> None:
+        """Forget all undo and redo entries."""
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self._ops = 0
+
+    def to_dict(self) -> Dict:
+        """Return the stacks in a JSON-serializable form."""
+        return {"undo": list(self.undo_stack), "redo": list(self.redo_stack)}
+
+    def load_dict(self, data: Dict) -> None:
+        """Replace the stacks with ones saved by to_dict()."""
+        self.clear()
+        for op in data.get("undo", []):
+            self._append(op)
+        self.redo_stack = list(data.get("redo", []))
+        self._report_drop()
+
+
+# ------------------------- Removal Journal -------------------------
+class RemovalJournal:
+    """
+    Append-only file of removed products.
+
+    Undo entries for a removal keep only the byte offset of the product's
+    line in this file instead of a copy of its whole transaction history.
+    Offsets are logical: once lines no entry refers to are cut from the
+    front (drop_before), a header line records where the file now starts,
+    so offsets already handed out, also saved ones, stay valid.
+    """
+
+    HEADER = b"#base %020d\n"  # First line of a trimmed journal: logical offset of the line after it
+    HEADER_SIZE = len(HEADER % 0)
+
+    def __init__(self, path: str):
+        """
+        path: Location of the journal file (JSON lines)
+        """
+        self.path = path
+
+    def _base(self, f) -> Tuple[int, int]:
+        """Return (logical offset of the first line, header bytes) of an open journal."""
+        f.seek(0)
+        head = f.read(self.HEADER_SIZE)
+        if len(head) == self.HEADER_SIZE and head.startswith(b"#base "):
+            return int(head[6:-1]), self.HEADER_SIZE
+        return 0, 0
+
+    def append(self, data: Dict) -> int:
+        """Write a serialized product and return its byte offset."""
+        with open(self.path, "a+b") as f:
+            base, header = self._base(f)
+            offset = f.seek(0, os.SEEK_END) - header + base
+            f.write(json.dumps(data, ensure_ascii=False).encode("utf-8") + b"\n")
+        return offset
+
+    def read(self, offset: int) -> Dict:
+        """Read back the serialized product written at offset."""
+        with open(self.path, "rb") as f:
+            base, header = self._base(f)
+            if offset < base:
+                raise ValueError(f"Journal offset {offset} was already reclaimed")
+            f.seek(offset - base + header)
+            return json.loads(f.readline())
+
+    def span(self) -> Tuple[int, int]:
+        """Return the (first, end) logical offsets the file holds; (0, 0) if there is no file."""
+        try:
+            with open(self.path, "rb") as f:
+                base, header = self._base(f)
+                return base, f.seek(0, os.SEEK_END) - header + base
+        except FileNotFoundError:
+            return 0, 0
+
+    def drop_before(self, offset: int) -> None:
+        """Rewrite the file without the lines before a logical offset (atomically)."""
+        with open(self.path, "rb") as f:
+            base, header = self._base(f)
+            f.seek(offset - base + header)
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as out:
+                out.write(self.HEADER % offset)
+                shutil.copyfileobj(f, out)
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        """Delete the journal file."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+# ------------------------- Change Events -------------------------
+class InventoryEvent(str, Enum):
+    """
+    Kinds of change notification sent by Inventory to its subscribers.
+
+    Members compare equal to their plain string values, so callbacks
+    written against 'added', 'changed', ... keep working.
+    """
+
+    ADDED = "added"       # A product was created
+    REMOVED = "removed"   # A product was deleted
+    CHANGED = "changed"   # A product's quantity or history changed
+    RESET = "reset"       # The catalog was replaced or many products changed at once; name is None
+                          # (Inventory.reset_names tells which products, if known)
+    UNDONE = "undone"     # An undo was applied, after its product events; name is None for batches
+    REDONE = "redone"     # A redo was applied, after its product events; name is None for batches
+
+
+# Events that describe the catalog itself; enough for anything mirroring products or quantities
+CATALOG_EVENTS = (InventoryEvent.ADDED, InventoryEvent.REMOVED, InventoryEvent.CHANGED, InventoryEvent.RESET)
+
+
+# ------------------------- Stock Analytics -------------------------
+class _SalesWindow:
+    """Daily units sold of one product over the rolling window, with running sums."""
+
+    __slots__ = ("days", "total", "total_sq", "first_day", "seen")
+
+    def __init__(self, first_day: int):
+        self.days: Deque[List[int]] = deque()  # [day_ordinal, units], oldest first
+        self.total = 0                         # Sum of daily units in the window
+        self.total_sq = 0                      # Sum of squared daily units in the window
+        self.first_day = first_day             # Day of the product's first transaction
+        self.seen = 0                          # Transactions already counted
+
+    def add(self, day: int, units: int) -> None:
+        """Add (or with negative units, take back) sales on a day."""
+        if self.days and day <= self.days[-1][0]:
+            bucket = self.days[-1]  # Same day (or a clock step back): count it with the newest day
+        else:
+            bucket = [day, 0]
+            self.days.append(bucket)
+        old = bucket[1]
+        bucket[1] = max(0, old + units)
+        self.total += bucket[1] - old
+        self.total_sq += bucket[1] * bucket[1] - old * old
+
+    def expire(self, today: int, window: int) -> None:
+        """Drop days that fell out of the window."""
+        while self.days and self.days[0][0] <= today - window:
+            _, units = self.days.popleft()
+            self.total -= units
+            self.total_sq -= units * units
+
+
+class StockAnalytics:
+    """
+    Sales velocity, days of cover and reorder points per product.
+
+    Aggregates are kept per product over a rolling window of daily sales
+    and updated from Inventory change notifications by reading only the
+    transactions added since the last update, so each add or sell costs
+    O(1). A product's history is read once, and only its last
+    window_days, the first time it is needed.
+
+    Reorder point = velocity * lead time + safety stock, where
+    safety stock = z * (std. dev. of daily sales) * sqrt(lead time).
+    The low-stock set is re-checked whenever a product changes.
+    """
+
+    def __init__(self, inventory: "Inventory", window_days: int = 28, lead_time_days: float = 7, service_z: float = 1.65):
+        """
+        inventory: Inventory to follow
+        window_days: Length of the rolling sales window
+        lead_time_days: Days between ordering and receiving stock
+        service_z: Safety factor (1.65 is about a 95% chance of not running out)
+        """
+        self.inventory = inventory
+        self.window_days = window_days
+        self.lead_time_days = lead_time_days
+        self.service_z = service_z
+        self._windows: Dict[str, _SalesWindow] = {}
+        self.low_stock: Set[str] = set()  # Products at or below their reorder point
+        self._complete = False            # True once every product has a window
+        inventory.subscribe(self._on_change, CATALOG_EVENTS)
+
+    @staticmethod
+    def _day(entry: Dict) -> int:
+        """Day ordinal of a transaction entry."""
+        return date.fromisoformat(entry["datetime"][:10]).toordinal()
+
+    def _on_change(self, event: InventoryEvent, name: Optional[str]) -> None:
+        """Follow Inventory changes."""
+        if event == InventoryEvent.RESET:
+            names = self.inventory.reset_names
+            if names is None:  # A new catalog: windows are built again when needed
+                self._windows.clear()
+                self.low_stock.clear()
+                self._complete = False
+                return
+            # Only the products the change touched are read again
+            for changed in names:
+                self._windows.pop(changed, None)
+                self.low_stock.discard(changed)
+                if self._complete:
+                    self._update(changed)
+        elif event == InventoryEvent.REMOVED:
+            self._windows.pop(name, None)
+            self.low_stock.discard(name)
+        elif name in self._windows or self._complete:
+            self._update(name)
+
+    def _update(self, name: str) -> Optional[_SalesWindow]:
+        """Count the product's new transactions and re-check its low-stock status."""
+        prod = self.inventory.products.get(name)
+        if prod is None or not prod.history_loaded or not prod.transactions:
+            return None
+        tx = prod.transactions
+        win = self._windows.get(name)
+        if win is None:
+            win = self._windows[name] = _SalesWindow(self._day(tx[0]))
+            # Read back only as far as the window reaches
+            oldest = date.today().toordinal() - self.window_days
+            start = len(tx)
+            while start > 0 and self._day(tx[start - 1]) > oldest:
+                start -= 1
+            win.seen = start
+        for entry in tx[win.seen:]:
+            act = entry.get("action")
+            if act == "sell":
+                win.add(self._day(entry), entry["quantity"])
+            elif act == "undo_sell":
+                win.add(self._day(entry), -entry["quantity"])
+            elif act == "summary":
+                win.add(self._day(entry), entry.get("sold", 0))
+        win.seen = len(tx)
+        stats = self._compute(prod, win)
+        if stats["velocity"] > 0 and prod.quantity <= stats["reorder_point"]:
+            self.low_stock.add(name)
+        else:
+            self.low_stock.discard(name)
+        return win
+
+    def _compute(self, prod: Product, win: _SalesWindow) -> Dict[str, float]:
+        """Turn a sales window into velocity, cover and reorder figures."""
+        today = date.today().toordinal()
+        win.expire(today, self.window_days)
+        days = max(1, min(self.window_days, today - win.first_day + 1))
+        velocity = win.total / days
+        variance = max(0.0, win.total_sq / days - velocity * velocity)
+        safety = self.service_z * math.sqrt(variance) * math.sqrt(self.lead_time_days)
+        return {
+            "velocity": velocity,
+            "days_of_cover": prod.quantity / velocity if velocity else math.inf,
+            "safety_stock": safety,
+            "reorder_point": velocity * self.lead_time_days + safety,
+        }
+
+    def stats(self, name: str) -> Optional[Dict[str, float]]:
+        """
+        Return {'velocity' (units/day), 'days_of_cover', 'safety_stock',
+        'reorder_point'} for a product, or None if it has no history yet.
+        """
+        win = self._windows.get(name) or self._update(name)
+        prod = self.inventory.products.get(name)
+        if win is None or prod is None:
+            return None
+        return self._compute(prod, win)
+
+    def _build_windows(self) -> None:
+        """Give every product its sales window; done once, later changes keep them current."""
+        if not self._complete:
+            for name in list(self.inventory.products):
+                if name not in self._windows:
+                    self._update(name)
+            self._complete = not self.inventory.loading
+
+    def low_stock_count(self) -> int:
+        """Number of products at or below their reorder point, read from the maintained set."""
+        self._build_windows()
+        return len(self.low_stock)
+
+    def low_stock_alerts(self) -> List[Tuple[str, Dict[str, float]]]:
+        """Return (name, stats) for products at or below their reorder point, least cover first."""
+        self._build_windows()
+        alerts = [(name, self.stats(name)) for name in self.low_stock]
+        alerts = [(name, st) for name, st in alerts if st is not None]
+        alerts.sort(key=lambda item: item[1]["days_of_cover"])
+        return alerts
+
+
 # ------------------------- Inventory Class -------------------------
 class Inventory:
     """
@@ -207,25 +985,113 @@ class Inventory:
     CSV import/export, and autosaving to disk.
     """
 
-    def __init__(self, autosave_filename: Optional[str] = None):
+    def __init__(
+        self,
+        autosave_filename: Optional[str] = None,
+        undo_limit: int = 500,
+        undo_op_limit: int = 200_000,
+        persist_history: bool = False,
+        load_on_init: bool = True,
+    ):
         """
         Initialize Inventory.
 
         autosave_filename: Optional path for autosave JSON file.
+        undo_limit: Maximum number of undo entries kept.
+        undo_op_limit: Maximum number of operation records kept in the undo history.
+        persist_history: Save the undo/redo history with the data so it survives a restart.
+        load_on_init: Load the autosave file now; pass False to load it later
+                      (see load_quantities() and read_saved()).
         """
         self.products: Dict[str, Product] = {}  # Dictionary of products by name
-        self.undo_stack: List[Dict] = []        # Stack for undo operations
-        self.redo_stack: List[Dict] = []        # Stack for redo operations
+        self.history = UndoHistory(undo_limit, undo_op_limit)  # Undo/redo stacks
+        self.history.on_drop = self._reclaim_journal
+        self.persist_history = persist_history
+        self.defer_saves = False                # When True, changes only mark the data dirty
+        self._dirty = False
+        # Change subscribers and the events each one wants (None = all)
+        self._listeners: List[Tuple[Callable[[InventoryEvent, Optional[str]], None], Optional[Set[InventoryEvent]]]] = []
+        self._muted = 0                         # >0 while a batch suppresses per-product notifications
+        self.reset_names: Optional[Set[str]] = None  # Products the last RESET changed; None = whole catalog
+        self.search_index = SearchIndex()       # Name index for the search box
+        self.subscribe(self._update_search_index, (InventoryEvent.ADDED, InventoryEvent.REMOVED, InventoryEvent.RESET))
+        self.analytics = StockAnalytics(self)  # Sales velocity and low-stock alerts
         self.autosave_file = (
             autosave_filename
             if autosave_filename
             else os.path.join(SCRIPT_DIR, "warehouse_data.json")  # Default file path
         )
+        base = os.path.splitext(self.autosave_file)[0]
+        self.quantities_file = base + "_quantities.json"  # Names and quantities only, for fast start
+        self.journal = RemovalJournal(base + "_removed.jsonl")
+        self._journal_kept = 0                  # Journal bytes still referred to after the last trim
+        self.loading = False                    # True between load_quantities() and finish_load()
+        self.last_save_bytes = 0                # Bytes written by the last save, both files together
+        if not persist_history:
+            self.journal.clear()  # Nothing can refer to entries from an earlier session
+        if not load_on_init:
+            return
         try:
             self.load()  # Load saved inventory if available
         except Exception as exc:
             logger.info("No autosave loaded: %s", exc)
 
+    # ----------------- Change Notifications -----------------
+    def subscribe(
+        self,
+        callback: Callable[[InventoryEvent, Optional[str]], None],
+        events: Optional[Iterable[InventoryEvent]] = None,
+    ) -> None:
+        """
+        Register a callback for inventory changes.
+
+        The callback receives (event, name): an InventoryEvent and the
+        affected product name (None for RESET and for batch undo/redo).
+        events: Only deliver these kinds of event (default: all)
+        """
+        wanted = {InventoryEvent(e) for e in events} if events is not None else None
+        self._listeners.append((callback, wanted))
+
+    def unsubscribe(self, callback: Callable[[InventoryEvent, Optional[str]], None]) -> None:
+        """Stop sending change notifications to callback."""
+        self._listeners = [entry for entry in self._listeners if entry[0] != callback]
+
+    def _notify(self, event: InventoryEvent, name: Optional[str]) -> None:
+        """Send a change notification to every subscriber interested in it."""
+        if self._muted:
+            return
+        for callback, events in list(self._listeners):
+            if events is not None and event not in events:
+                continue
+            try:
+                callback(event, name)
+            except Exception as exc:
+                logger.exception("Change listener failed: %s", exc)
+
+    def _notify_reset(self, names: Optional[Iterable[str]] = None) -> None:
+        """
+        Send a RESET notification.
+
+        names: The only products the change touched (added, removed or
+               changed), so followers can update just those; None when
+               the whole catalog was replaced
+        """
+        self.reset_names = set(names) if names is not None else None
+        self._notify(InventoryEvent.RESET, None)
+
+    def _update_search_index(self, event: InventoryEvent, name: Optional[str]) -> None:
+        """Keep the search index in step with products being added or removed."""
+        if event == InventoryEvent.ADDED:
+            self.search_index.add(name)
+        elif event == InventoryEvent.REMOVED:
+            self.search_index.remove(name)
+        elif event == InventoryEvent.RESET:
+            self.search_index.rebuild(self.products)
+
+    def search(self, query: str) -> List[str]:
+        """Return product names matching query, best matches first."""
+        return self.search_index.search(query)
+
     # ----------------- Product Management -----------------
     def list_products(self) -> List[Product]:
         """Return a list of all products currently in inventory."""
@@ -244,16 +1110,16 @@ class Inventory:
         if name in self.products:
             old = self.products[name].quantity
             self.products[name].replace_initial(qty)
-            self.undo_stack.append({"op": "replace", "name": name, "old": old, "new": qty})
-            self.redo_stack.clear()
-            self.save()
+            self.history.push({"op": "replace", "name": name, "old": old, "new": qty})
+            self._autosave()
+            self._notify(InventoryEvent.CHANGED, name)
             return False, old
         else:
             p = Product(name, qty)
             self.products[name] = p
-            self.undo_stack.append({"op": "add_product", "name": name, "qty": qty})
-            self.redo_stack.clear()
-            self.save()
+            self.history.push({"op": "add_product", "name": name, "qty": qty})
+            self._autosave()
+            self._notify(InventoryEvent.ADDED, name)
             return True, None
 
     def add_stock(self, name: str, qty: int) -> bool:
@@ -269,9 +1135,9 @@ class Inventory:
         prod = self.products[name]
         prev = prod.quantity
         prod.add(qty)
-        self.undo_stack.append({"op": "add", "name": name, "qty": qty, "prev": prev})
-        self.redo_stack.clear()
-        self.save()
+        self.history.push({"op": "add", "name": name, "qty": qty, "prev": prev, "ts": time.time()})
+        self._autosave()
+        self._notify(InventoryEvent.CHANGED, name)
         return True
 
     def sell_stock(self, name: str, qty: int) -> bool:
@@ -289,9 +1155,9 @@ class Inventory:
         ok = prod.sell(qty)
         if not ok:
             return False
-        self.undo_stack.append({"op": "sell", "name": name, "qty": qty, "prev": prev})
-        self.redo_stack.clear()
-        self.save()
+        self.history.push({"op": "sell", "name": name, "qty": qty, "prev": prev, "ts": time.time()})
+        self._autosave()
+        self._notify(InventoryEvent.CHANGED, name)
         return True
 
     def remove_product(self, name: str) -> bool:
@@ -303,22 +1169,293 @@ class Inventory:
         name = name.lower()
         if name in self.products:
             prod = self.products.pop(name)
-            self.undo_stack.append({"op": "remove_product", "product": self._serialize_product(prod)})
-            self.redo_stack.clear()
-            self.save()
+            offset = self.journal.append(self._serialize_product(prod))
+            self.history.push({"op": "remove_product", "name": name, "offset": offset})
+            self._autosave()
+            self._notify(InventoryEvent.REMOVED, name)
             return True
         return False
 
+    JOURNAL_TRIM_BYTES = 1 << 16  # Smallest journal worth trimming
+
+    def _reclaim_journal(self) -> None:
+        """
+        Cut removal journal lines no undo or redo entry refers to any more.
+
+        Runs when the history drops entries that referred to the journal,
+        but only scans the history once the file has doubled since the
+        last trim, and only rewrites it when the unused part is at least
+        as large as the part kept, so the cost stays proportional to the
+        bytes journaled.
+        """
+        first, end = self.journal.span()
+        if end - first < max(self.JOURNAL_TRIM_BYTES, 2 * self._journal_kept):
+            return
+        oldest = self.history.oldest_offset()
+        keep_from = end if oldest is None else oldest
+        self._journal_kept = end - keep_from
+        if keep_from - first >= max(self.JOURNAL_TRIM_BYTES // 2, self._journal_kept):
+            try:
+                self.journal.drop_before(keep_from)
+            except OSError as exc:
+                logger.warning("Could not trim the removal journal: %s", exc)
+
+    def clear(self) -> None:
+        """Remove all products and forget the undo/redo history."""
+        self.products.clear()
+        self.history.clear()
+        self.journal.clear()
+        self._autosave()
+        self._notify_reset()
+
+    # ----------------- Transfers -----------------
+    def transfer_out(self, name: str, qty: int, ref: str, dest: str) -> bool:
+        """
+        Take stock out for a transfer to another location (see Warehouses.transfer).
+
+        Undo/redo entries recorded before the transfer would restore
+        quantities that no longer hold, so the undo history is cleared.
+        Returns False if the product is missing or has too little stock.
+        """
+        name = name.lower()
+        qty = int(qty)
+        prod = self.products.get(name)
+        if prod is None or qty <= 0 or qty > prod.quantity:
+            return False
+        prod.quantity -= qty
+        prod._record("transfer_out", qty, ref=ref, location=dest)
+        self.history.clear()
+        self.journal.clear()
+        self._autosave()
+        self._notify(InventoryEvent.CHANGED, name)
+        return True
+
+    def transfer_in(self, name: str, qty: int, ref: str, source: str) -> None:
+        """Receive transferred stock, creating the product if this location has none."""
+        name = name.lower()
+        qty = int(qty)
+        prod = self.products.get(name)
+        created = prod is None
+        if created:
+            prod = self.products[name] = Product(name, 0)
+        prod.quantity += qty
+        prod._record("transfer_in", qty, ref=ref, location=source)
+        self.history.clear()
+        self.journal.clear()
+        self._autosave()
+        self._notify(InventoryEvent.ADDED if created else InventoryEvent.CHANGED, name)
+
+    def has_transfer(self, name: str, ref: str) -> bool:
+        """Return True if the product's history holds the transfer with reference ref."""
+        prod = self.products.get(name.lower())
+        if prod is None:
+            return False
+        return any(entry.get("ref") == ref for entry in reversed(prod.transactions))
+
+    # ----------------- History Compaction -----------------
+    def compact_history(self, max_age_days: int = 90, period: str = "month", archive_path: Optional[str] = None) -> int:
+        """
+        Roll transactions older than max_age_days into summary entries.
+
+        Each product's old entries are replaced by one 'summary' entry per
+        day or month holding the net units added, sold and transferred and
+        the closing balance, so running totals and exports still add up. Existing
+        summaries are merged again, e.g. daily ones into monthly ones.
+
+        period: 'day' or 'month'
+        archive_path: Optional JSON-lines file the raw entries are appended to
+
+        Returns the number of entries removed from the live history.
+        """
+        if period not in ("day", "month"):
+            raise ValueError(f"period must be 'day' or 'month', not {period!r}")
+        if self.loading:
+            return 0
+        cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat(timespec="seconds")
+        key_len = 10 if period == "day" else 7  # Length of 'YYYY-MM-DD' / 'YYYY-MM'
+        removed = 0
+        compacted: List[str] = []
+        archive = open(archive_path, "a", encoding="utf-8") if archive_path else None
+        try:
+            for prod in self.products.values():
+                tx = prod.transactions
+                n = 0
+                while n < len(tx) and tx[n]["datetime"] < cutoff:  # ISO timestamps sort as text
+                    n += 1
+                if n == 0:
+                    continue
+                summaries = self._summarize(tx[:n], key_len)
+                if len(summaries) >= n:
+                    continue  # Already as compact as it gets
+                if archive is not None:
+                    for entry in tx[:n]:
+                        if entry["action"] != "summary":
+                            archive.write(json.dumps({"name": prod.name, **entry}, ensure_ascii=False) + "\n")
+                prod.transactions = summaries + tx[n:]
+                removed += n - len(summaries)
+                compacted.append(prod.name)
+        finally:
+            if archive is not None:
+                archive.close()
+        if removed:
+            self._autosave()
+            self._notify_reset(compacted)  # Transaction positions changed for everyone following them
+        return removed
+
+    @staticmethod
+    def _summarize(entries: List[Dict], key_len: int) -> List[Dict]:
+        """Fold entries into one summary per period (first key_len characters of the timestamp)."""
+        summaries: List[Dict] = []
+        for entry, current in running_stock(entries):
+            key = entry["datetime"][:key_len]
+            if not summaries or summaries[-1]["period"] != key:
+                summaries.append({"action": "summary", "period": key, "added": 0, "sold": 0, "transferred": 0})
+            summary = summaries[-1]
+            act = entry["action"]
+            if act == "summary":
+                summary["added"] += entry["added"]
+                summary["sold"] += entry["sold"]
+                summary["transferred"] += entry.get("transferred", 0)
+            elif act == "transfer_in":
+                summary["transferred"] += entry["quantity"]
+            elif act == "transfer_out":
+                summary["transferred"] -= entry["quantity"]
+            elif act == "add":
+                summary["added"] += entry["quantity"]
+            elif act == "sell":
+                summary["sold"] += entry["quantity"]
+            elif act == "undo_add":
+                summary["added"] -= entry["quantity"]
+            elif act == "undo_sell":
+                summary["sold"] -= entry["quantity"]
+            summary["quantity"] = current             # Closing balance
+            summary["datetime"] = entry["datetime"]   # Time of the last entry in the period
+        return summaries
+
+    # ----------------- Batch Operations -----------------
+    BATCH_EVENT_LIMIT = 1000  # Larger batches send one 'reset' instead of per-product notifications
+
+    def apply_batch(self, ops: List[Dict]) -> Tuple[bool, List[str]]:
+        """
+        Apply a whole shipment or order at once, all-or-nothing.
+
+        ops: List of {"op": "add" | "sell" | "set" | "remove", "name": ..., "qty": ...}.
+             'set' adds a product or replaces its quantity; 'remove' needs no qty.
+
+        Every line is validated against current stock first, taking the
+        earlier lines of the same batch into account. If any line fails,
+        nothing is changed. Otherwise the batch is applied, recorded as one
+        undo entry and saved once.
+
+        Returns:
+            (True, []) if the batch was applied,
+            (False, error_messages) if it was rejected.
+        """
+        steps, errors = self._validate_batch(ops)
+        if errors:
+            return False, errors
+        if not steps:
+            return True, []
+
+        undo_ops: List[Dict] = []
+        existed: Dict[str, bool] = {}  # Whether each touched product existed before the batch
+        for typ, name, qty in steps:
+            existed.setdefault(name, name in self.products)
+            prod = self.products.get(name)
+            if typ == "set" and prod is None:
+                self.products[name] = Product(name, qty)
+                undo_ops.append({"op": "add_product", "name": name, "qty": qty})
+            elif typ == "set":
+                undo_ops.append({"op": "replace", "name": name, "old": prod.quantity, "new": qty})
+                prod.replace_initial(qty)
+            elif typ == "add":
+                undo_ops.append({"op": "add", "name": name, "qty": qty, "prev": prod.quantity})
+                prod.add(qty)
+            elif typ == "sell":
+                undo_ops.append({"op": "sell", "name": name, "qty": qty, "prev": prod.quantity})
+                prod.sell(qty)
+            else:
+                offset = self.journal.append(self._serialize_product(self.products.pop(name)))
+                undo_ops.append({"op": "remove_product", "name": name, "offset": offset})
+        self.history.push({"op": "batch", "ops": undo_ops})
+        self._autosave()
+
+        if len(existed) > self.BATCH_EVENT_LIMIT:
+            self._notify_reset(existed)
+            return True, []
+        for name, before in existed.items():
+            after = name in self.products
+            if before and after:
+                self._notify(InventoryEvent.CHANGED, name)
+            elif after:
+                self._notify(InventoryEvent.ADDED, name)
+            elif before:
+                self._notify(InventoryEvent.REMOVED, name)
+        return True, []
+
+    def _validate_batch(self, ops: List[Dict]) -> Tuple[List[Tuple[str, str, int]], List[str]]:
+        """
+        Check a batch against current stock without changing anything.
+
+        Returns the normalized (op, name, qty) steps and a list of error
+        messages, one per rejected line.
+        """
+        steps: List[Tuple[str, str, int]] = []
+        errors: List[str] = []
+        projected: Dict[str, Optional[int]] = {}  # Quantity after earlier lines; None = no product
+
+        for line, op in enumerate(ops, start=1):
+            typ = op.get("op")
+            name = str(op.get("name") or "").strip().lower()
+            if typ not in ("add", "sell", "set", "remove"):
+                errors.append(f"Line {line}: unknown operation {typ!r}.")
+                continue
+            if not name:
+                errors.append(f"Line {line}: missing product name.")
+                continue
+            qty = 0
+            if typ != "remove":
+                try:
+                    qty = int(op.get("qty"))
+                except (TypeError, ValueError, OverflowError):
+                    errors.append(f"Line {line}: quantity must be an integer.")
+                    continue
+                if qty < 0 or (qty == 0 and typ != "set"):
+                    errors.append(f"Line {line}: quantity must be {'non-negative' if typ == 'set' else 'positive'}.")
+                    continue
+
+            if name not in projected:
+                prod = self.products.get(name)
+                projected[name] = prod.quantity if prod is not None else None
+            current = projected[name]
+            if typ == "set":
+                projected[name] = qty
+            elif current is None:
+                errors.append(f"Line {line}: product '{name}' not found.")
+                continue
+            elif typ == "add":
+                projected[name] = current + qty
+            elif typ == "sell":
+                if qty > current:
+                    errors.append(f"Line {line}: not enough stock of '{name}' ({current} left, {qty} requested).")
+                    continue
+                projected[name] = current - qty
+            else:
+                projected[name] = None
+            steps.append((typ, name, qty))
+        return steps, errors
+
     # ----------------- Undo/Redo -----------------
     def undo(self) -> bool:  # "AI"
         """Undo the last operation if possible."""
-        if not self.undo_stack:
+        op = self.history.pop_undo()
+        if op is None:
             return False
-        op = self.undo_stack.pop()
         try:
             self._apply_undo(op)
-            self.redo_stack.append(op)
-            self.save()
+            self.history.undone(op)
+            self._autosave()
+            self._notify(InventoryEvent.UNDONE, op.get("name"))
             return True
         except Exception as exc:
             logger.exception("Undo failed: %s", exc)
@@ -326,13 +1463,14 @@ class Inventory:
 
     def redo(self) -> bool:  # "AI"
         """Redo the last undone operation if possible."""
-        if not self.redo_stack:
+        op = self.history.pop_redo()
+        if op is None:
             return False
-        op = self.redo_stack.pop()
         try:
             self._apply_redo(op)
-            self.undo_stack.append(op)
-            self.save()
+            self.history.redone(op)
+            self._autosave()
+            self._notify(InventoryEvent.REDONE, op.get("name"))
             return True
         except Exception as exc:
             logger.exception("Redo failed: %s", exc)
@@ -346,27 +1484,40 @@ class Inventory:
             name = op["name"]
             if name in self.products:
                 self.products.pop(name)
+                self._notify(InventoryEvent.REMOVED, name)
         elif typ == "remove_product":
-            prod_data = op["product"]
+            prod_data = self.journal.read(op["offset"])
             p = self._deserialize_product(prod_data)
             self.products[p.name] = p
+            self._notify(InventoryEvent.ADDED, p.name)
         elif typ == "replace":
             name = op["name"]
             old = op["old"]
             if name in self.products:
                 self.products[name].replace_initial(old)
+                self._notify(InventoryEvent.CHANGED, name)
         elif typ == "add":
             name = op["name"]
             prev = op["prev"]
             if name in self.products:
                 self.products[name].quantity = prev
                 self.products[name]._record("undo_add", op.get("qty", 0))
+                self._notify(InventoryEvent.CHANGED, name)
         elif typ == "sell":
             name = op["name"]
             prev = op["prev"]
             if name in self.products:
                 self.products[name].quantity = prev
                 self.products[name]._record("undo_sell", op.get("qty", 0))
+                self._notify(InventoryEvent.CHANGED, name)
+        elif typ == "batch":
+            self._muted += 1
+            try:
+                for sub in reversed(op["ops"]):
+                    self._apply_undo(sub)
+            finally:
+                self._muted -= 1
+            self._notify_reset(sub["name"] for sub in op["ops"])  # One rebuild instead of a notification per product
         else:
             logger.debug("Unknown undo op: %s", op)
 
@@ -378,26 +1529,38 @@ class Inventory:
             qty = op.get("qty", 0)
             if name not in self.products:
                 self.products[name] = Product(name, qty)
+                self._notify(InventoryEvent.ADDED, name)
         elif typ == "remove_product":
-            prod_data = op["product"]
-            name = prod_data["name"]
+            name = op["name"]
             if name in self.products:
                 self.products.pop(name)
+                self._notify(InventoryEvent.REMOVED, name)
         elif typ == "replace":
             name = op["name"]
             new = op.get("new")
             if name in self.products and new is not None:
                 self.products[name].replace_initial(new)
+                self._notify(InventoryEvent.CHANGED, name)
         elif typ == "add":
             name = op["name"]
             qty = op.get("qty", 0)
             if name in self.products:
                 self.products[name].add(qty)
+                self._notify(InventoryEvent.CHANGED, name)
         elif typ == "sell":
             name = op["name"]
             qty = op.get("qty", 0)
             if name in self.products:
                 self.products[name].sell(qty)
+                self._notify(InventoryEvent.CHANGED, name)
+        elif typ == "batch":
+            self._muted += 1
+            try:
+                for sub in op["ops"]:
+                    self._apply_redo(sub)
+            finally:
+                self._muted -= 1
+            self._notify_reset(sub["name"] for sub in op["ops"])
         else:
             logger.debug("Unknown redo op: %s", op)
 
@@ -408,68 +1571,174 @@ class Inventory:
 
     def _deserialize_product(self, data: Dict) -> Product:
         """Convert a dictionary back into a Product instance."""
-        p = Product(data["name"], 0)
-        p.quantity = int(data.get("quantity", 0))
-        p.transactions = data.get("transactions", []).copy()
-        return p
+        return Product.restore(data["name"], data.get("quantity", 0), list(data.get("transactions", [])))
 
     # ----------------- Save / Load -----------------
     def save(self) -> bool:  # "AI"
         """Save inventory data to JSON file on disk."""
+        if self.loading:
+            logger.info("Not saving while the catalog is still loading")
+            return False
         try:
             data = {"products": [self._serialize_product(p) for p in self.products.values()]}
+            if self.persist_history:
+                data["history"] = self.history.to_dict()
             with open(self.autosave_file, "w", encoding="utf-8") as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
+                written = f.tell()
+            # Small names/quantities file read first by the fast-start loader
+            quantities = [[p.name, p.quantity] for p in self.products.values()]
+            with open(self.quantities_file, "w", encoding="utf-8") as f:
+                json.dump({"products": quantities}, f, ensure_ascii=False)
+                self.last_save_bytes = written + f.tell()
             return True
         except Exception as exc:
             logger.exception("Failed to save inventory: %s", exc)
             return False
 
+    def _autosave(self) -> None:
+        """Save after a change, or just mark the data dirty while saves are deferred."""
+        if self.defer_saves:
+            self._dirty = True
+        else:
+            self.save()
+
+    def flush(self) -> bool:
+        """Save pending changes made while saves were deferred; they stay pending if the save fails."""
+        if not self._dirty:
+            return True
+        self._dirty = False
+        if not self.save():
+            self._dirty = True  # Retried by the next flush()
+            return False
+        return True
+
     def load(self) -> bool:
         """Load inventory data from JSON file on disk."""
         try:
             if not os.path.isfile(self.autosave_file):
                 return False
-            with open(self.autosave_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            prods = data.get("products", [])
-            self.products.clear()
-            for pd in prods:
-                p = self._deserialize_product(pd)
-                self.products[p.name] = p
-            return True
+            return self.finish_load(self.read_saved())
         except Exception as exc:
             logger.exception("Failed to load inventory: %s", exc)
+            self.loading = False
             self.products = {}
+            self._notify_reset()
             return False
 
+    def read_saved(self) -> Tuple[Dict[str, Product], Optional[Dict]]:
+        """
+        Read the autosave file and rebuild its products without touching the inventory.
+
+        Safe to call from a worker thread; pass the result to finish_load().
+        Returns (products_by_name, saved_history_or_None).
+        """
+        # Millions of new dicts would trigger many pointless full collections; nothing here is garbage
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(self.autosave_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            products: Dict[str, Product] = {}
+            for pd in data.get("products", []):
+                p = self._deserialize_product(pd)
+                products[p.name] = p
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        return products, data.get("history")
+
+    def finish_load(self, loaded: Tuple[Dict[str, Product], Optional[Dict]]) -> bool:
+        """Replace the in-memory catalog with the result of read_saved()."""
+        products, history = loaded
+        self.products = products
+        if self.persist_history and history is not None:
+            self.history.load_dict(history)
+        self.loading = False
+        self._notify_reset()
+        return True
+
+    def load_quantities(self) -> bool:
+        """
+        Fast first step of a background start: load only names and quantities.
+
+        Products get no transaction history until finish_load() runs, and
+        saving is refused until then so the history on disk is never lost.
+        Returns False, and changes nothing, if there is no valid quantities file.
+        """
+        try:
+            with open(self.quantities_file, "r", encoding="utf-8") as f:
+                rows = json.load(f).get("products", [])
+            products = {name: Product.restore(name, qty, None) for name, qty in rows}
+        except (OSError, ValueError, TypeError, AttributeError) as exc:
+            logger.info("No quantities file loaded: %s", exc)
+            return False
+        self.loading = True
+        self.products = products
+        self._notify_reset()
+        return True
+
     # ----------------- CSV Import -----------------
-    def import_from_csv(self, path: str) -> Tuple[int, int]:  # "AI"
+    def import_from_csv(self, path: str, progress: Optional[Callable[[int, float], None]] = None) -> Tuple[int, int]:  # "AI"
         """
         Import products from a CSV file.
 
+        The file is streamed in chunks and the whole import is recorded as
+        a single undo entry, so undo reverts the import in one step.
+
+        progress: Optional callback receiving (rows_done, fraction_of_file)
+                  after each chunk.
+
         Returns:
             (added_count, replaced_count) indicating number of new products added
             and existing products replaced.
         """
-        pairs = self.parse_csv_file(path)
+        undo_ops: List[Dict] = []
+        added = replaced = rows = 0
+        try:
+            for pairs, fraction in self.iter_csv_chunks(path):
+                a, r = self.import_rows(pairs, undo_ops)
+                added += a
+                replaced += r
+                rows += len(pairs)
+                if progress is not None:
+                    progress(rows, fraction)
+        except Exception as exc:
+            logger.exception("Failed to parse CSV %s: %s", path, exc)
+        self.finish_import(undo_ops)
+        return added, replaced
+
+    def import_rows(self, pairs: List[Tuple[str, int]], undo_ops: List[Dict]) -> Tuple[int, int]:
+        """
+        Apply one chunk of imported (name, qty) pairs without saving.
+
+        Undo records are collected in undo_ops; call finish_import() once
+        after the last chunk to store them as a single batched entry.
+
+        Returns (added_count, replaced_count) for this chunk.
+        """
+        products = self.products
         added = replaced = 0
         for name, qty in pairs:
             name = name.lower()
-            if name in self.products:
-                old = self.products[name].quantity
-                self.products[name].replace_initial(qty)
-                self.undo_stack.append({"op": "replace", "name": name, "old": old, "new": qty})
+            prod = products.get(name)
+            if prod is not None:
+                undo_ops.append({"op": "replace", "name": name, "old": prod.quantity, "new": qty})
+                prod.replace_initial(qty)
                 replaced += 1
             else:
-                p = Product(name, qty)
-                self.products[name] = p
-                self.undo_stack.append({"op": "add_product", "name": name, "qty": qty})
+                products[name] = Product(name, qty)
+                undo_ops.append({"op": "add_product", "name": name, "qty": qty})
                 added += 1
-        self.redo_stack.clear()
-        self.save()
         return added, replaced
 
+    def finish_import(self, undo_ops: List[Dict]) -> None:
+        """Record an import as one undo entry, save once and notify subscribers."""
+        if undo_ops:
+            self.history.push({"op": "batch", "ops": undo_ops})
+        self._autosave()
+        self._notify_reset(op["name"] for op in undo_ops)  # One rebuild instead of a notification per row
+
     @staticmethod
     def parse_csv_file(path: str) -> List[Tuple[str, int]]:  # "AI"
         """
@@ -479,41 +1748,116 @@ class Inventory:
         """
         pairs: List[Tuple[str, int]] = []
         try:
-            with open(path, newline="", encoding="utf-8") as csvfile:
-                reader = csv.reader(csvfile)
-                for row in reader:
-                    if not row:
-                        continue
-                    cells = [c.strip() for c in row if c and str(c).strip() != ""]
-                    if not cells:
-                        continue
-                    low0 = cells[0].lower()
-                    if low0 in ("product", "name") and len(cells) > 1 and not Inventory._is_int(cells[1]):
-                        continue
-                    qty = None
-                    name = None
-                    for i in range(1, len(cells)):
-                        if Inventory._is_int(cells[i]):
-                            qty = int(float(cells[i]))
-                            name = cells[0]
-                            break
-                    if qty is None and len(cells) == 1:
-                        parts = cells[0].replace(",", " ").split()
-                        if len(parts) >= 2 and Inventory._is_int(parts[-1]):
-                            qty = int(float(parts[-1]))
-                            name = " ".join(parts[:-1])
-                    if qty is None:
-                        for i, c in enumerate(cells):
-                            if Inventory._is_int(c):
-                                qty = int(float(c))
-                                name = cells[i - 1] if i > 0 else cells[0]
-                                break
-                    if qty is not None and name:
-                        pairs.append((name.strip(), int(qty)))
+            for chunk, _ in Inventory.iter_csv_chunks(path):
+                pairs.extend(chunk)
         except Exception as exc:
             logger.exception("Failed to parse CSV %s: %s", path, exc)
         return pairs
 
+    @staticmethod
+    def iter_csv_chunks(path: str, chunk_size: int = 5000) -> Iterator[Tuple[List[Tuple[str, int]], float]]:
+        """
+        Stream (name, qty) pairs from a CSV file in chunks.
+
+        The column layout (which column holds the name and which the
+        quantity) is recognized once from the first plain data row; later rows
+        are read straight from those columns. Rows that do not fit the
+        layout fall back to the per-cell heuristics of _parse_row().
+
+        Yields (pairs, fraction) where fraction is how much of the file
+        has been read so far, for progress reporting.
+        """
+        total = os.path.getsize(path) or 1
+        read = 0
+        with open(path, newline="", encoding="utf-8") as csvfile:
+
+            def lines():
+                nonlocal read
+                for line in csvfile:
+                    read += len(line)
+                    yield line
+
+            layout: Optional[Tuple[int, int]] = None
+            chunk: List[Tuple[str, int]] = []
+            for row in csv.reader(lines()):
+                pair = None
+                if layout is not None:
+                    name_col, qty_col = layout
+                    try:
+                        name = row[name_col].strip()
+                        qty = int(row[qty_col])
+                        if name:
+                            pair = (name, qty)
+                    except (IndexError, ValueError):
+                        pass
+                if pair is None:
+                    if layout is None:
+                        layout = Inventory._detect_layout(row)
+                    pair = Inventory._parse_row(row)
+                if pair is not None:
+                    chunk.append(pair)
+                    if len(chunk) >= chunk_size:
+                        yield chunk, min(1.0, read / total)
+                        chunk = []
+            yield chunk, 1.0
+
+    @staticmethod
+    def _detect_layout(row: List[str]) -> Optional[Tuple[int, int]]:
+        """
+        Recognize a plain 'name, qty, ...' row.
+
+        Returns (name_column, qty_column), or None if the row is a header,
+        empty, or does not start with a name followed by an integer column.
+        A row with an empty cell before its quantity gives no layout:
+        _parse_row() takes the first integer column, which in later rows
+        may be that empty column.
+        """
+        if len(row) < 2 or not row[0].strip():
+            return None
+        try:
+            int(row[1].strip())
+        except ValueError:
+            return None
+        return 0, 1
+
+    @staticmethod
+    def _parse_row(row: List[str]) -> Optional[Tuple[str, int]]:  # "AI"
+        """
+        Extract a (product_name, quantity) pair from one CSV row.
+
+        Handles header rows, empty cells and 'name qty' packed into a
+        single cell. Returns None if the row holds no usable pair.
+        """
+        if not row:
+            return None
+        cells = [c.strip() for c in row if c and str(c).strip() != ""]
+        if not cells:
+            return None
+        low0 = cells[0].lower()
+        if low0 in ("product", "name") and len(cells) > 1 and not Inventory._is_int(cells[1]):
+            return None
+        qty = None
+        name = None
+        for i in range(1, len(cells)):
+            if Inventory._is_int(cells[i]):
+                qty = int(float(cells[i]))
+                name = cells[0]
+                break
+        if qty is None and len(cells) == 1:
+            parts = cells[0].replace(",", " ").split()
+            if len(parts) >= 2 and Inventory._is_int(parts[-1]):
+                qty = int(float(parts[-1]))
+                name = " ".join(parts[:-1])
+        if qty is None:
+            for i, c in enumerate(cells):
+                if Inventory._is_int(c):
+                    qty = int(float(c))
+                    name = cells[i - 1] if i > 0 else cells[0]
+                    break
+        if qty is not None and name:
+            return name.strip(), int(qty)
+        return None
+
     @staticmethod
     def _is_int(s: str) -> bool:
         """Check if a string can be converted to an integer."""
@@ -524,14 +1868,629 @@ class Inventory:
             return False
 
 
+# ------------------------- Warehouses -------------------------
+class Warehouses:
+    """
+    Several warehouse locations, each an independently saved Inventory.
+
+    Every location (shard) lives in its own folder under data_dir with its
+    own autosave, quantities and journal files, so a change at one
+    location never rewrites another. Shards are opened on first use, so a
+    site can load just the locations it works with.
+
+    Stock totals per product across the open locations are kept up to
+    date from each shard's change notifications, costing O(1) per change.
+    """
+
+    LOCATION_CHARS = set("abcdefghijklmnopqrstuvwxyz0123456789_-")
+
+    def __init__(self, data_dir: Optional[str] = None):
+        """
+        data_dir: Folder holding one sub-folder per location
+                  (defaults to 'warehouses' next to this script)
+        """
+        self.data_dir = data_dir if data_dir else os.path.join(SCRIPT_DIR, "warehouses")
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.shards: Dict[str, Inventory] = {}
+        self.totals: Dict[str, int] = {}             # Product name -> stock across open locations
+        self._seen: Dict[str, Dict[str, int]] = {}   # Location -> product -> quantity counted in totals
+        self.pending_file = os.path.join(self.data_dir, "transfer_pending.json")
+        self._recover_transfer()
+
+    @classmethod
+    def _check_location(cls, location: str) -> str:
+        """Normalize a location name; raise ValueError if it cannot be a folder name."""
+        location = location.strip().lower()
+        if not location or not set(location) <= cls.LOCATION_CHARS:
+            raise ValueError(f"Invalid location name {location!r} (use letters, digits, '_' and '-')")
+        return location
+
+    def locations(self) -> List[str]:
+        """Return the names of all locations saved on disk, open or not."""
+        return sorted(
+            entry for entry in os.listdir(self.data_dir)
+            if os.path.isfile(os.path.join(self.data_dir, entry, "warehouse_data.json"))
+        )
+
+    def open(self, location: str, **kwargs) -> Inventory:
+        """
+        Return the Inventory of a location, loading it on first use.
+
+        kwargs: Passed on to Inventory (e.g. persist_history, load_on_init)
+        """
+        location = self._check_location(location)
+        inv = self.shards.get(location)
+        if inv is None:
+            folder = os.path.join(self.data_dir, location)
+            os.makedirs(folder, exist_ok=True)
+            inv = Inventory(os.path.join(folder, "warehouse_data.json"), **kwargs)
+            self.shards[location] = inv
+            self._seen[location] = {}
+            inv.subscribe(lambda event, name: self._on_change(location, event, name), CATALOG_EVENTS)
+            self._on_change(location, InventoryEvent.RESET, None)
+        return inv
+
+    def close(self, location: str) -> None:
+        """Save and drop an open location; its stock leaves the totals."""
+        location = self._check_location(location)
+        inv = self.shards.pop(location, None)
+        if inv is None:
+            return
+        inv.flush()
+        for name, qty in self._seen.pop(location).items():
+            self._count(name, -qty)
+
+    # ----------------- Cross-Location Totals -----------------
+    def _count(self, name: str, delta: int) -> None:
+        """Change a product's total, dropping it once no open location stocks it."""
+        total = self.totals.get(name, 0) + delta
+        if total or any(name in seen for seen in self._seen.values()):
+            self.totals[name] = total
+        else:
+            self.totals.pop(name, None)
+
+    def _on_change(self, location: str, event: InventoryEvent, name: Optional[str]) -> None:
+        """Apply one shard's change to the totals."""
+        seen = self._seen[location]
+        products = self.shards[location].products
+        if event == InventoryEvent.RESET:
+            old = dict(seen)
+            seen.clear()
+            for old_name, qty in old.items():
+                self._count(old_name, -qty)
+            for prod in products.values():
+                seen[prod.name] = prod.quantity
+                self._count(prod.name, prod.quantity)
+        elif event == InventoryEvent.REMOVED:
+            self._count(name, -seen.pop(name, 0))
+        else:
+            qty = products[name].quantity
+            delta = qty - seen.get(name, 0)
+            seen[name] = qty
+            self._count(name, delta)
+
+    def total(self, name: str) -> int:
+        """Return the stock of a product across all open locations."""
+        return self.totals.get(name.lower(), 0)
+
+    def stock_by_location(self, name: str) -> Dict[str, int]:
+        """Return {location: quantity} for the open locations stocking a product."""
+        name = name.lower()
+        return {loc: seen[name] for loc, seen in self._seen.items() if name in seen}
+
+    # ----------------- Transfers -----------------
+    def transfer(self, name: str, qty: int, source: str, dest: str) -> bool:
+        """
+        Move stock of a product from one location to another, all-or-nothing.
+
+        The transfer is written to a pending file first and each side
+        records it under the same reference, so if the program stops
+        between saving the two locations the next start completes it.
+        Both locations' undo histories are cleared.
+
+        Returns True on success, False if the locations are the same,
+        still loading, or the source has too little stock.
+        """
+        source = self._check_location(source)
+        dest = self._check_location(dest)
+        name = name.lower()
+        qty = int(qty)
+        if source == dest or qty <= 0:
+            return False
+        src = self.open(source)
+        dst = self.open(dest)
+        if src.loading or dst.loading:
+            return False
+        prod = src.products.get(name)
+        if prod is None or qty > prod.quantity:
+            return False
+        record = {"ref": uuid.uuid4().hex, "name": name, "qty": qty, "source": source, "dest": dest}
+        tmp = self.pending_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp, self.pending_file)
+        self._complete(record)
+        return True
+
+    def _complete(self, record: Dict) -> None:
+        """Apply whichever sides of a pending transfer are missing, then drop the pending file."""
+        src = self.open(record["source"])
+        dst = self.open(record["dest"])
+        name, qty, ref = record["name"], record["qty"], record["ref"]
+        if not src.has_transfer(name, ref):
+            src.transfer_out(name, qty, ref, record["dest"])
+        if src.has_transfer(name, ref) and not dst.has_transfer(name, ref):
+            dst.transfer_in(name, qty, ref, record["source"])
+        src.flush()
+        dst.flush()
+        os.remove(self.pending_file)
+
+    def _recover_transfer(self) -> None:
+        """Finish a transfer interrupted between saving its two locations."""
+        try:
+            with open(self.pending_file, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return
+        logger.info("Completing interrupted transfer %s", record.get("ref"))
+        try:
+            self._complete(record)
+        except Exception as exc:
+            logger.exception("Failed to complete transfer: %s", exc)
+
+
+# ------------------------- Export -------------------------
+class ExportCancelled(Exception):
+    """Raised inside an export when the user pressed Cancel."""
+
+
+class ExportJob:
+    """
+    Export every product transaction to a file on a worker thread.
+
+    Rows are generated lazily from a snapshot of the product list and
+    streamed to the writer, so memory stays flat however long the
+    history is. Supported formats are chosen by file extension:
+    .xlsx (openpyxl write-only mode), .csv and .parquet (needs pyarrow).
+    """
+
+    HEADERS = ["Product", "Action", "Quantity", "Date/Time", "Stock After"]
+    PARQUET_BATCH = 50_000  # Rows per Parquet row group
+
+    def __init__(self, inventory: Inventory, path: str):
+        """
+        Snapshot the products to export.
+
+        inventory: Inventory to export
+        path: Destination file; its extension selects the format
+        """
+        self.path = path
+        ext = os.path.splitext(path)[1].lower()
+        self.writer = {".xlsx": self._write_xlsx, ".csv": self._write_csv, ".parquet": self._write_parquet}.get(ext)
+        if self.writer is None:
+            raise ValueError(f"Unsupported export format: {ext or path}")
+        # Transaction lists are only appended to, so remembering their length is enough of a snapshot
+        self.products = [(p.name, p.transactions, len(p.transactions)) for p in inventory.list_products()]
+        self.total = sum(n for _, _, n in self.products)
+        self.done = 0                          # Rows written so far
+        self.error: Optional[Exception] = None
+        self.cancelled = False
+        self._cancel = threading.Event()
+        self.finished = threading.Event()
+
+    def start(self) -> None:
+        """Run the export on a daemon worker thread."""
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def cancel(self) -> None:
+        """Ask the worker to stop; the partial file is removed."""
+        self._cancel.set()
+
+    def run(self) -> None:
+        """Write the file, recording any error or cancellation."""
+        try:
+            self.writer(self.rows())
+        except ExportCancelled:
+            self.cancelled = True
+            self._remove_partial()
+        except Exception as exc:
+            logger.exception("Failed to export %s: %s", self.path, exc)
+            self.error = exc
+            self._remove_partial()
+        finally:
+            self.finished.set()
+
+    def _remove_partial(self) -> None:
+        """Delete a half-written export file."""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def rows(self) -> Iterator[List]:
+        """Yield one row per transaction, with the stock level after it."""
+        for name, transactions, count in self.products:
+            for entry, current in running_stock(itertools.islice(transactions, count)):
+                if self._cancel.is_set():
+                    raise ExportCancelled()
+                self.done += 1
+                if entry["action"] == "summary":
+                    # Net change over the summarized period
+                    qty = entry["added"] - entry["sold"] + entry.get("transferred", 0)
+                else:
+                    qty = entry["quantity"]
+                yield [name, entry["action"], qty, entry["datetime"], current]
+
+    def _write_xlsx(self, rows: Iterator[List]) -> None:
+        """Stream rows into a write-only openpyxl workbook."""
+        # Imported on first export: openpyxl is slow to import and not needed to start the app
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font, PatternFill
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Warehouse Transactions")
+        header = []
+        for h in self.HEADERS:
+            cell = WriteOnlyCell(ws, value=h)
+            cell.font = Font(bold=True)
+            cell.fill = PatternFill(start_color="FFFF99", end_color="FFFF99", fill_type="solid")
+            header.append(cell)
+        ws.append(header)
+        for row in rows:
+            ws.append(row)
+        wb.save(self.path)
+
+    def _write_csv(self, rows: Iterator[List]) -> None:
+        """Stream rows into a CSV file."""
+        with open(self.path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.HEADERS)
+            writer.writerows(rows)
+
+    def _write_parquet(self, rows: Iterator[List]) -> None:
+        """Stream rows into a Parquet file, one row group per batch."""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs the pyarrow package (pip install pyarrow).")
+        schema = pa.schema([
+            ("product", pa.string()),
+            ("action", pa.string()),
+            ("quantity", pa.int64()),
+            ("datetime", pa.string()),
+            ("stock_after", pa.int64()),
+        ])
+        with pq.ParquetWriter(self.path, schema) as writer:
+            while True:
+                batch = list(itertools.islice(rows, self.PARQUET_BATCH))
+                if not batch:
+                    break
+                columns = [list(col) for col in zip(*batch)]
+                writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+
+
+# ------------------------- Headless Service -------------------------
+class InventoryService:
+    """
+    Single-writer front end that lets many clients share one Inventory.
+
+    Every command is queued to one writer thread that owns the Inventory,
+    so sales posted by several stations at once never race on quantities
+    or the undo history. The writer drains whatever commands are waiting,
+    runs them, saves once for the whole group and only then answers the
+    callers.
+    """
+
+    def __init__(self, inventory: Inventory, max_group: int = 256):
+        """
+        Start the writer thread.
+
+        inventory: Inventory owned by the writer from now on
+        max_group: Maximum number of commands handled per save
+        """
+        self.inventory = inventory
+        self.max_group = max_group
+        self._commands: queue.Queue = queue.Queue()
+        self._writer = threading.Thread(target=self._run, name="inventory-writer", daemon=True)
+        self._writer.start()
+
+    def call(self, fn: Callable[[Inventory], object]) -> object:
+        """Run fn(inventory) on the writer thread and return its result."""
+        future: Future = Future()
+        self._commands.put((fn, future))
+        return future.result()
+
+    def close(self) -> None:
+        """Finish the queued commands and stop the writer thread."""
+        self._commands.put((None, None))
+        self._writer.join()
+
+    def _run(self) -> None:
+        """Writer loop: run queued commands in groups with one save per group."""
+        inv = self.inventory
+        inv.defer_saves = True
+        running = True
+        while running:
+            group = [self._commands.get()]
+            while len(group) < self.max_group:
+                try:
+                    group.append(self._commands.get_nowait())
+                except queue.Empty:
+                    break
+            done = []
+            for fn, future in group:
+                if fn is None:
+                    running = False
+                    continue
+                try:
+                    done.append((future, fn(inv), None))
+                except Exception as exc:
+                    done.append((future, None, exc))
+            # Answer only once the group is on disk
+            saved = inv.flush()
+            for future, result, exc in done:
+                if exc is None and not saved:
+                    future.set_exception(OSError("The change was made but could not be saved to disk yet."))
+                elif exc is not None:
+                    future.set_exception(exc)
+                else:
+                    future.set_result(result)
+        inv.defer_saves = False
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP/JSON API over InventoryService.
+
+    GET    /products?search=text       list products (name, quantity)
+    GET    /products/<name>            one product with its transactions
+    POST   /products                   {"name": ..., "qty": ...} add or replace
+    POST   /products/<name>/add        {"qty": ...} add stock
+    POST   /products/<name>/sell       {"qty": ...} sell stock
+    DELETE /products/<name>            remove a product
+    POST   /batch                      {"ops": [...]} all-or-nothing batch, see Inventory.apply_batch
+    POST   /undo, POST /redo
+    """
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, so busy stations reuse one connection
+    disable_nagle_algorithm = True  # Headers and body go out in separate writes
+
+    def log_message(self, format, *args):
+        """Route request logs to the warehouse logger instead of stderr."""
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _send(self, status: int, payload: object) -> None:
+        """Write a JSON response."""
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _parts(self) -> List[str]:
+        """Split the request path into unquoted segments."""
+        return [unquote(p) for p in urlparse(self.path).path.split("/") if p]
+
+    def _body(self) -> Dict:
+        """Read the JSON request body (empty dict if missing or invalid)."""
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True  # The body cannot be skipped without its length
+            raise ValueError("Invalid Content-Length header.")
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return {}
+        return body if isinstance(body, dict) else {}
+
+    def _body_qty(self, minimum: int) -> Tuple[Dict, Optional[int]]:
+        """Read the JSON body and its integer 'qty' field (None if invalid)."""
+        body = self._body()
+        try:
+            qty = int(body.get("qty"))
+        except (ValueError, TypeError, OverflowError):
+            return body, None
+        return body, (qty if qty >= minimum else None)
+
+    def _answer(self, handler: Callable[[], None]) -> None:
+        """Run a request handler; bad client input becomes a 400 response and a failed save a 500."""
+        try:
+            handler()
+        except (ValueError, TypeError, OverflowError) as exc:
+            logger.info("Bad request %s %s: %s", self.command, self.path, exc)
+            self._send(400, {"error": str(exc) or "Bad request."})
+        except OSError as exc:
+            logger.error("Request %s %s failed: %s", self.command, self.path, exc)
+            self._send(500, {"error": str(exc)})
+
+    def do_GET(self):
+        self._answer(self._get)
+
+    def do_POST(self):
+        self._answer(self._post)
+
+    def do_DELETE(self):
+        self._answer(self._delete)
+
+    def _get(self):
+        """List products or show one product."""
+        service: InventoryService = self.server.service
+        parts = self._parts()
+        if parts == ["products"]:
+            search = parse_qs(urlparse(self.path).query).get("search", [""])[0]
+
+            def listing(inv):
+                names = inv.search(search)
+                return [{"name": n, "quantity": inv.products[n].quantity} for n in names]
+
+            self._send(200, service.call(listing))
+        elif len(parts) == 2 and parts[0] == "products":
+            name = parts[1].lower()
+
+            def detail(inv):
+                prod = inv.products.get(name)
+                if prod is None:
+                    return None
+                return {"name": prod.name, "quantity": prod.quantity, "transactions": list(prod.transactions)}
+
+            result = service.call(detail)
+            if result is None:
+                self._send(404, {"error": f"Product '{name}' not found."})
+            else:
+                self._send(200, result)
+        else:
+            self._send(404, {"error": "Not found."})
+
+    def _post(self):
+        """Add/replace products, change stock, undo and redo."""
+        service: InventoryService = self.server.service
+        parts = self._parts()
+        if parts in (["undo"], ["redo"]):
+            ok = service.call(lambda inv: inv.undo() if parts[0] == "undo" else inv.redo())
+            self._send(200 if ok else 409, {"ok": ok})
+        elif parts == ["batch"]:
+            ops = self._body().get("ops")
+            if not isinstance(ops, list) or not all(isinstance(op, dict) for op in ops):
+                self._send(400, {"error": "Send {\"ops\": [...]} with one object per line."})
+                return
+            ok, errors = service.call(lambda inv: inv.apply_batch(ops))
+            self._send(200 if ok else 409, {"ok": ok, "errors": errors})
+        elif parts == ["products"]:
+            body, qty = self._body_qty(0)
+            name = str(body.get("name") or "").strip()
+            if not name or qty is None:
+                self._send(400, {"error": "Send a product name and a non-negative integer qty."})
+                return
+            added, old = service.call(lambda inv: inv.add_or_replace_product(name, qty))
+            self._send(201 if added else 200, {"added": added, "old": old})
+        elif len(parts) == 3 and parts[0] == "products" and parts[2] in ("add", "sell"):
+            name, action = parts[1].lower(), parts[2]
+            _, qty = self._body_qty(1)
+            if qty is None:
+                self._send(400, {"error": "qty must be a positive integer."})
+                return
+
+            def change(inv):
+                if name not in inv.products:
+                    return None
+                ok = inv.add_stock(name, qty) if action == "add" else inv.sell_stock(name, qty)
+                return ok, inv.products[name].quantity
+
+            result = service.call(change)
+            if result is None:
+                self._send(404, {"error": f"Product '{name}' not found."})
+            elif not result[0]:
+                self._send(409, {"error": "Not enough stock.", "quantity": result[1]})
+            else:
+                self._send(200, {"name": name, "quantity": result[1]})
+        else:
+            self._send(404, {"error": "Not found."})
+
+    def _delete(self):
+        """Remove a product."""
+        parts = self._parts()
+        if len(parts) == 2 and parts[0] == "products":
+            name = parts[1]
+            if self.server.service.call(lambda inv: inv.remove_product(name)):
+                self._send(200, {"removed": name.lower()})
+            else:
+                self._send(404, {"error": f"Product '{name}' not found."})
+        else:
+            self._send(404, {"error": "Not found."})
+
+
+def make_server(inventory: Inventory, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """Create (but do not start) the HTTP server for headless service mode."""
+    server = ThreadingHTTPServer((host, port), ServiceRequestHandler)
+    server.daemon_threads = True
+    server.service = InventoryService(inventory)
+    return server
+
+
+# ------------------------- Product List Model -------------------------
+class ProductListModel:
+    """
+    Filtered view of the inventory used by the product table.
+
+    Rows come from the Inventory search index, which stays sorted and
+    up to date through change notifications, so the catalog is never
+    re-sorted or re-scanned on a refresh. The table asks only for the
+    window of rows that is currently visible.
+    """
+
+    def __init__(self, inventory: Inventory):
+        """
+        Attach to an inventory and show all of its products.
+
+        inventory: Inventory whose products are listed
+        """
+        self.inventory = inventory
+        self.search: str = ""                                   # Current search filter
+        self.rows: List[str] = inventory.search_index.names     # Names matching the filter
+        self.top: int = 0                                       # Index of the first visible row
+
+    def _filter(self) -> None:
+        """Recompute the rows for the current search filter."""
+        if self.search:
+            self.rows = self.inventory.search(self.search)
+        else:
+            self.rows = self.inventory.search_index.names  # Live sorted array, no copy
+
+    def set_search(self, search: str) -> bool:
+        """
+        Apply a new search filter.
+
+        Returns True if the filter changed and the rows were recomputed.
+        """
+        search = search.strip().lower()
+        if search == self.search:
+            return False
+        self.search = search
+        self._filter()
+        self.top = 0
+        return True
+
+    def apply_change(self, event: InventoryEvent, name: Optional[str]) -> None:
+        """Refresh the rows after a product was added, removed or the catalog reset."""
+        if event in (InventoryEvent.ADDED, InventoryEvent.REMOVED, InventoryEvent.RESET):
+            self._filter()
+
+    def scroll_to(self, top: int, visible: int) -> None:
+        """Move the visible window so it starts at row top, clamped to the row count."""
+        self.top = max(0, min(top, len(self.rows) - visible))
+
+    def window(self, visible: int) -> List[str]:
+        """Return the names of the rows inside the visible window."""
+        self.scroll_to(self.top, visible)
+        return self.rows[self.top:self.top + visible]
+
+
 # ------------------------- WarehouseApp GUI Class -------------------------
 class WarehouseApp(tk.Tk):  # "AI"
     """Tkinter GUI to interact with Inventory class for managing products and transactions."""
 
-    def __init__(self, inventory: Inventory):
-        """Initialize main window, attach Inventory, and build GUI components."""
+    def __init__(self, inventory: Inventory, instrumentation: Optional[Instrumentation] = None):
+        """
+        Initialize main window, attach Inventory, and build GUI components.
+
+        instrumentation: Optional Instrumentation timing the GUI handlers; adds a Debug menu
+        """
         super().__init__()
         self.inventory = inventory
+        self.instrumentation = instrumentation
+        if instrumentation is not None:
+            instrumentation.instrument_app(self)  # Before the widgets capture the bound handlers
+        self.list_model = ProductListModel(inventory)  # Sorted view behind the product table
+        self.visible_rows = 20                         # Rows materialized in the table
+        self.selected_name: Optional[str] = None
+        self._import_job: Optional[Dict] = None        # Running background CSV import
+        self._export_job: Optional[ExportJob] = None   # Running background export
         self.title("Warehouse Manager — Improved")
         self.geometry("1000x640")
         self.minsize(800, 420)
@@ -542,19 +2501,60 @@ class WarehouseApp(tk.Tk):  # "AI"
         self._build_middle()       # product list and transactions
         self._build_bottom()       # bottom buttons
         self._bind_shortcuts()     # keyboard shortcuts
+        self.inventory.subscribe(self._on_inventory_change, CATALOG_EVENTS)
+        self.protocol("WM_DELETE_WINDOW", self._wrap(self.on_quit))
         self.refresh_products_table()  # populate table with inventory
+        self.after_idle(self._refresh_low_stock_button)
+
+    def start_background_load(self) -> None:
+        """
+        Fast start: show saved quantities right away and load the full
+        catalog with transaction histories on a worker thread.
+        Without a quantities file there is nothing to show early, so the
+        catalog is loaded right away instead.
+        """
+        if not self.inventory.load_quantities():
+            self.inventory.load()
+            return
+        self.label_status.config(text="Loading catalog...")
+        result: Dict = {}
+
+        def worker():
+            """Read and parse the autosave file off the Tk thread."""
+            try:
+                result["data"] = self.inventory.read_saved()
+            except Exception as exc:
+                result["error"] = exc
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+
+        def poll():
+            """Install the parsed catalog on the Tk thread once the worker is done."""
+            if thread.is_alive():
+                self.after(50, poll)
+                return
+            if "data" in result:
+                self.inventory.finish_load(result["data"])
+            else:
+                logger.info("No autosave loaded: %s", result.get("error"))
+                self.inventory.loading = False  # Keep the quantities; saving is allowed again
+            self.label_status.config(text="")
+
+        self.after(50, poll)
 
     def _build_menu(self):
         """Create menu bar with File and Edit options."""
         menubar = tk.Menu(self)
         filem = tk.Menu(menubar, tearoff=False)
         filem.add_command(label="Import CSV...", command=self._wrap(self.on_import_csv))
-        filem.add_command(label="Export to Excel...", command=self._wrap(self.on_export_excel))
+        filem.add_command(label="Export...", command=self._wrap(self.on_export))
         filem.add_separator()
         filem.add_command(label="Save now", command=self._wrap(self._save_now))
         filem.add_command(label="Load from disk", command=self._wrap(self._manual_load))
+        filem.add_command(label="Compact old history...", command=self._wrap(self.on_compact_history))
         filem.add_separator()
-        filem.add_command(label="Quit", command=self._wrap(self.quit))
+        filem.add_command(label="Quit", command=self._wrap(self.on_quit))
         menubar.add_cascade(label="File", menu=filem)
 
         editm = tk.Menu(menubar, tearoff=False)
@@ -562,6 +2562,11 @@ class WarehouseApp(tk.Tk):  # "AI"
         editm.add_command(label="Redo (Ctrl+Y)", command=self._wrap(self.on_redo))
         menubar.add_cascade(label="Edit", menu=editm)
 
+        if self.instrumentation is not None:
+            debugm = tk.Menu(menubar, tearoff=False)
+            debugm.add_command(label="Performance...", command=self.show_performance)
+            menubar.add_cascade(label="Debug", menu=debugm)
+
         self.config(menu=menubar)
 
     def _build_top(self):  # "AI"
@@ -605,16 +2610,22 @@ class WarehouseApp(tk.Tk):  # "AI"
         self.tree.column("qty", width=100, anchor=tk.CENTER)
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
-        vsb = ttk.Scrollbar(left_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscroll=vsb.set)
-        vsb.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.bind("<Configure>", self._on_tree_configure)
+        self.tree.bind("<MouseWheel>", self._on_tree_wheel)
+        self.tree.bind("<Button-4>", self._on_tree_wheel)
+        self.tree.bind("<Button-5>", self._on_tree_wheel)
+        # The scrollbar drives the list model, not the Treeview: only visible rows exist in the tree
+        self.vsb = ttk.Scrollbar(left_frame, orient=tk.VERTICAL, command=self._on_scroll)
+        self.vsb.pack(side=tk.RIGHT, fill=tk.Y)
 
         # Right frame: selected product info, stock controls, transactions
         right_frame = ttk.Frame(middle, width=380)
         middle.add(right_frame, weight=0)
         ttk.Label(right_frame, text="Selected Product:").pack(anchor=tk.W)
         self.label_selected = ttk.Label(right_frame, text="(none)")
-        self.label_selected.pack(anchor=tk.W, pady=(0, 8))
+        self.label_selected.pack(anchor=tk.W)
+        self.label_stats = ttk.Label(right_frame, text="")  # Sales velocity / cover / reorder point
+        self.label_stats.pack(anchor=tk.W, pady=(0, 8))
 
         # Stock controls
         ctrl = ttk.Frame(right_frame)
@@ -646,7 +2657,7 @@ class WarehouseApp(tk.Tk):  # "AI"
         """Create bottom button panel for Export, Undo/Redo, Clear All, and Quit."""
         bottom = ttk.Frame(self, padding=6)
         bottom.pack(side=tk.BOTTOM, fill=tk.X)
-        btn_export = ttk.Button(bottom, text="Export to Excel", command=self._wrap(self.on_export_excel))
+        btn_export = ttk.Button(bottom, text="Export", command=self._wrap(self.on_export))
         btn_export.pack(side=tk.LEFT, padx=6)
         btn_undo = ttk.Button(bottom, text="Undo", command=self._wrap(self.on_undo))
         btn_undo.pack(side=tk.LEFT, padx=6)
@@ -654,13 +2665,39 @@ class WarehouseApp(tk.Tk):  # "AI"
         btn_redo.pack(side=tk.LEFT, padx=6)
         btn_clear = ttk.Button(bottom, text="Clear All", command=self._wrap(self.on_clear_all))
         btn_clear.pack(side=tk.LEFT, padx=6)
-        btn_quit = ttk.Button(bottom, text="Quit", command=self._wrap(self.quit))
+        self.btn_low_stock = ttk.Button(bottom, text="Low stock (0)", command=self._wrap(self.on_show_low_stock))
+        self.btn_low_stock.pack(side=tk.LEFT, padx=6)
+        btn_quit = ttk.Button(bottom, text="Quit", command=self._wrap(self.on_quit))
         btn_quit.pack(side=tk.RIGHT, padx=6)
 
+        # Progress of background jobs (CSV import, export)
+        self.btn_cancel = ttk.Button(bottom, text="Cancel", state=tk.DISABLED, command=self._wrap(self.on_cancel_job))
+        self.btn_cancel.pack(side=tk.RIGHT, padx=6)
+        self.progress = ttk.Progressbar(bottom, length=180, mode="determinate", maximum=1.0)
+        self.progress.pack(side=tk.RIGHT, padx=6)
+        self.label_status = ttk.Label(bottom, text="")
+        self.label_status.pack(side=tk.RIGHT, padx=6)
+
+    # Handlers that neither change nor save the catalog
+    IMPORT_SAFE = ("on_quit", "on_cancel_job", "on_open_transactions", "on_show_low_stock")
+
     def _wrap(self, fn):
-        """Wrap a function to play a click sound asynchronously before execution."""
+        """
+        Wrap a function to play a click sound asynchronously before execution.
+
+        While the catalog loads, or a CSV import is being applied chunk by
+        chunk, only the handlers in IMPORT_SAFE run; anything else could
+        interleave with the half-applied catalog and its pending undo entry.
+        """
         def wrapped(*a, **kw):
             play_click_sound_async()
+            if fn.__name__ not in self.IMPORT_SAFE:
+                if self.inventory.loading:
+                    messagebox.showinfo("Loading", "The catalog is still loading, please wait a moment.")
+                    return None
+                if self._import_job is not None:
+                    messagebox.showinfo("Import", "A CSV import is running, please wait for it to finish.")
+                    return None
             return fn(*a, **kw)
         return wrapped
 
@@ -671,33 +2708,89 @@ class WarehouseApp(tk.Tk):  # "AI"
 
     def refresh_products_table(self):  # "AI"
         """Update the product treeview based on current inventory and search filter."""
-        search = self.entry_search.get().strip().lower() if hasattr(self, "entry_search") else ""
-        desired = [name for name in sorted(self.inventory.products.keys()) if (not search or search in name)]
-        current = set(self.tree.get_children())
-        desired_set = set(desired)
-
-        # remove items no longer needed
-        for iid in list(current - desired_set):
-            self.tree.delete(iid)
-
-        # add new items and update existing
-        for name in desired:
-            prod = self.inventory.products.get(name)
-            if name in current:
-                vals = self.tree.item(name, "values")
-                try:
-                    current_qty = int(vals[1])
-                except Exception:
-                    current_qty = None
-                if current_qty != prod.quantity:
-                    self.tree.item(name, values=(prod.name, prod.quantity))
+        search = self.entry_search.get() if hasattr(self, "entry_search") else ""
+        self.list_model.set_search(search)
+        self._render_rows()
+
+    def _render_rows(self) -> None:
+        """Materialize only the visible window of the product list in the treeview."""
+        model = self.list_model
+        window = model.window(self.visible_rows)
+        wanted = set(window)
+
+        # remove rows that scrolled out or were filtered away
+        for iid in self.tree.get_children():
+            if iid not in wanted:
+                self.tree.delete(iid)
+
+        # insert missing rows and keep the rest in model order
+        for pos, name in enumerate(window):
+            prod = self.inventory.products[name]
+            if self.tree.exists(name):
+                self.tree.item(name, values=(prod.name, prod.quantity))
+                self.tree.move(name, "", pos)
             else:
-                self.tree.insert("", tk.END, iid=name, values=(prod.name, prod.quantity))
+                self.tree.insert("", pos, iid=name, values=(prod.name, prod.quantity))
+
+        total = len(model.rows)
+        if total:
+            self.vsb.set(model.top / total, min(1.0, (model.top + len(window)) / total))
+        else:
+            self.vsb.set(0.0, 1.0)
+
+    def _on_inventory_change(self, event: InventoryEvent, name: Optional[str]) -> None:
+        """Apply a targeted table and detail update for a single Inventory change."""
+        self._refresh_low_stock_button()
+        if event == InventoryEvent.CHANGED:
+            if name and self.tree.exists(name):
+                prod = self.inventory.products[name]
+                self.tree.item(name, values=(prod.name, prod.quantity))
+        else:
+            self.list_model.apply_change(event, name)
+            self._render_rows()
+        if self.selected_name and (name == self.selected_name or event == InventoryEvent.RESET):
+            self._show_selected(self.inventory.products.get(self.selected_name))
+
+    def _on_tree_configure(self, event):
+        """Recompute how many rows fit in the treeview after a resize."""
+        try:
+            row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        except (TypeError, ValueError):
+            row_height = 20
+        rows = max(1, (event.height - row_height) // row_height)  # minus the heading row
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self._render_rows()
+
+    def _on_scroll(self, *args):
+        """Handle scrollbar drags and clicks by moving the visible window."""
+        model = self.list_model
+        if args[0] == "moveto":
+            top = int(float(args[1]) * len(model.rows))
+        elif args[0] == "scroll":
+            step = self.visible_rows if args[2] == "pages" else 1
+            top = model.top + int(args[1]) * step
+        else:
+            return
+        model.scroll_to(top, self.visible_rows)
+        self._render_rows()
+
+    def _on_tree_wheel(self, event):
+        """Scroll the visible window with the mouse wheel."""
+        if event.num == 4 or event.delta > 0:
+            step = -3
+        else:
+            step = 3
+        self.list_model.scroll_to(self.list_model.top + step, self.visible_rows)
+        self._render_rows()
+        return "break"
 
     def _on_tree_select(self, event):
         """Handle product selection: display product info and transactions."""
         sel = self.tree.selection()
         if not sel:
+            if self.selected_name in self.inventory.products and not self.tree.exists(self.selected_name):
+                return  # selected row only scrolled out of the visible window
             self._show_selected(None)
             return
         iid = sel[0]
@@ -709,22 +2802,32 @@ class WarehouseApp(tk.Tk):  # "AI"
         self.tree_tx.delete(*self.tree_tx.get_children())
         if prod is None:
             self.label_selected.config(text="(none)")
+            self.label_stats.config(text="")
             self.selected_name = None
             return
         self.selected_name = prod.name
         self.label_selected.config(text=f"{prod.name} — {prod.quantity}")
-        current = 0
-        for entry in prod.transactions:
+        if not prod.history_loaded:
+            self.label_stats.config(text="")
+            self.tree_tx.insert("", tk.END, values=("loading...", "", "", ""))
+            return
+        stats = self.inventory.analytics.stats(prod.name)
+        if stats and stats["velocity"] > 0:
+            self.label_stats.config(
+                text=f"Sells {stats['velocity']:.1f}/day — {stats['days_of_cover']:.0f} days of cover — "
+                     f"reorder at {math.ceil(stats['reorder_point'])}"
+            )
+        else:
+            self.label_stats.config(text="No recent sales")
+        for entry, current in running_stock(prod.transactions):
             act = entry.get("action")
-            qty = entry.get("quantity")
-            ts = entry.get("datetime")
-            if act in ("initial", "initial_replace"):
-                current = qty
-            elif act == "add":
-                current += qty
-            elif act == "sell":
-                current -= qty
-            self.tree_tx.insert("", tk.END, values=(act, qty, ts, current))
+            if act == "summary":
+                qty = f"+{entry['added']} -{entry['sold']}"
+                if entry.get("transferred"):
+                    qty += f" moved {entry['transferred']:+d}"
+            else:
+                qty = entry.get("quantity")
+            self.tree_tx.insert("", tk.END, values=(act, qty, entry.get("datetime"), current))
 
     # ---------------- Product Operations ----------------
     def on_add_replace_product(self):  # "AI"
@@ -743,7 +2846,6 @@ class WarehouseApp(tk.Tk):  # "AI"
         added, old = self.inventory.add_or_replace_product(name, qty)
         self.entry_name.delete(0, tk.END)
         self.entry_qty.delete(0, tk.END)
-        self.refresh_products_table()
         msg = f"Added '{name}' with qty {qty}." if added else f"Replaced '{name}' old qty {old} -> {qty}."
         messagebox.showinfo("Product updated", msg)
 
@@ -755,7 +2857,6 @@ class WarehouseApp(tk.Tk):  # "AI"
             return
         if self.inventory.remove_product(name):
             self.entry_name.delete(0, tk.END)
-            self.refresh_products_table()
             messagebox.showinfo("Removed", f"Product '{name}' removed.")
         else:
             messagebox.showerror("Error", f"Product '{name}' not found.")
@@ -777,8 +2878,6 @@ class WarehouseApp(tk.Tk):  # "AI"
             messagebox.showerror("Error", "Failed to add stock (product missing).")
             return
         self.entry_amount.delete(0, tk.END)
-        self._show_selected(self.inventory.products[self.selected_name])
-        self.refresh_products_table()
 
     def on_sell_stock(self):  # "AI"
         """Decrease stock of selected product by specified amount, ensuring sufficient quantity."""
@@ -797,10 +2896,34 @@ class WarehouseApp(tk.Tk):  # "AI"
             messagebox.showerror("Error", "Not enough stock or product missing.")
             return
         self.entry_amount.delete(0, tk.END)
-        self._show_selected(self.inventory.products[self.selected_name])
-        self.refresh_products_table()
 
     # ---------------- Transactions ----------------
+    def _refresh_low_stock_button(self) -> None:
+        """Show the number of low-stock alerts on the bottom button."""
+        if self.inventory.loading:
+            return
+        # The sorted alert list is only built when the dialog opens
+        self.btn_low_stock.config(text=f"Low stock ({self.inventory.analytics.low_stock_count()})")
+
+    def on_show_low_stock(self):
+        """Open a popup listing products at or below their reorder point."""
+        alerts = self.inventory.analytics.low_stock_alerts()
+        if not alerts:
+            messagebox.showinfo("Low stock", "No products are below their reorder point.")
+            return
+        popup = tk.Toplevel(self)
+        popup.title("Low stock alerts")
+        cols = ("name", "qty", "velocity", "cover", "reorder")
+        tv = ttk.Treeview(popup, columns=cols, show="headings")
+        for c, h in zip(cols, ("Product", "Quantity", "Sold/day", "Days of cover", "Reorder point")):
+            tv.heading(c, text=h)
+            tv.column(c, width=100 if c != "name" else 220, anchor=tk.CENTER if c != "name" else tk.W)
+        tv.pack(fill=tk.BOTH, expand=True)
+        for name, st in alerts:
+            prod = self.inventory.products[name]
+            tv.insert("", tk.END, values=(name, prod.quantity, f"{st['velocity']:.1f}",
+                                          f"{st['days_of_cover']:.1f}", math.ceil(st["reorder_point"])))
+
     def on_open_transactions(self):
         """Open a popup window displaying all transactions for the selected product."""
         if not hasattr(self, "selected_name") or not self.selected_name:
@@ -818,56 +2941,171 @@ class WarehouseApp(tk.Tk):  # "AI"
             tv.insert("", tk.END, values=(e["action"], e["quantity"], e["datetime"]))
 
     def on_import_csv(self):  # "AI"
-        """Load product data from a CSV file and update the table."""
+        """Load product data from a CSV file in the background and update the table."""
+        if self._import_job is not None:
+            messagebox.showinfo("Import", "An import is already running.")
+            return
         path = filedialog.askopenfilename(title="Open CSV", filetypes=[("CSV files", "*.csv"), ("All files", "*")])
         if not path:
             return
-        try:
-            added, replaced = self.inventory.import_from_csv(path)
-            self.refresh_products_table()
-            messagebox.showinfo("Import", f"Completed. Added: {added}, Replaced: {replaced}")
-        except Exception as exc:
-            logger.exception("Import CSV failed: %s", exc)
-            messagebox.showerror("Import Error", str(exc))
+        chunks: queue.Queue = queue.Queue(maxsize=4)  # Bounded, so the reader never runs far ahead
+
+        def worker():
+            """Parse the file on a worker thread; the GUI thread applies the chunks."""
+            try:
+                # Through the instance, so --instrument times the parsing
+                for pairs, fraction in self.inventory.iter_csv_chunks(path):
+                    chunks.put(("chunk", pairs, fraction))
+                chunks.put(("done", None, 1.0))
+            except Exception as exc:
+                logger.exception("Import CSV failed: %s", exc)
+                chunks.put(("error", exc, 1.0))
+
+        self._import_job = {"queue": chunks, "undo": [], "added": 0, "replaced": 0, "rows": 0, "shown": 0}
+        self.progress["value"] = 0.0
+        self.label_status.config(text="Importing...")
+        threading.Thread(target=worker, daemon=True).start()
+        self.after(50, self._poll_import)
+
+    def _poll_import(self):
+        """Apply parsed CSV chunks for a short time slice, then yield back to Tk."""
+        job = self._import_job
+        if job is None:
+            return  # Finished by on_quit()
+        deadline = time.perf_counter() + 0.03
+        while time.perf_counter() < deadline:
+            try:
+                kind, payload, fraction = job["queue"].get_nowait()
+            except queue.Empty:
+                break
+            if kind == "chunk":
+                added, replaced = self.inventory.import_rows(payload, job["undo"])
+                job["added"] += added
+                job["replaced"] += replaced
+                job["rows"] += len(payload)
+                self.progress["value"] = fraction
+                self.label_status.config(text=f"Importing... {job['rows']} rows")
+                if added and job["added"] >= 2 * job["shown"]:
+                    # Show the new products; rebuilt each time their number doubles, so O(N log N) in total
+                    self.inventory.search_index.rebuild(self.inventory.products)
+                    self.list_model.apply_change(InventoryEvent.RESET, None)
+                    self._render_rows()
+                    job["shown"] = job["added"]
+                continue
+            self._import_job = None
+            self.inventory.finish_import(job["undo"])
+            self.progress["value"] = 0.0
+            self.label_status.config(text="")
+            if kind == "error":
+                messagebox.showerror("Import Error", str(payload))
+            else:
+                messagebox.showinfo("Import", f"Completed. Added: {job['added']}, Replaced: {job['replaced']}")
+            return
+        self.after(50, self._poll_import)
 
-    def on_export_excel(self):  # "AI"
-        """Export all products and transactions to an Excel file."""
+    def on_export(self):  # "AI"
+        """Export all products and transactions to Excel, CSV or Parquet in the background."""
         if not self.inventory.products:
             messagebox.showinfo("Export", "No products to export.")
             return
+        if self._export_job is not None:
+            messagebox.showinfo("Export", "An export is already running.")
+            return
         default = f"warehouse_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        path = filedialog.asksaveasfilename(defaultextension=".xlsx", initialfile=default, filetypes=[("Excel files", "*.xlsx")])
+        path = filedialog.asksaveasfilename(
+            defaultextension=".xlsx",
+            initialfile=default,
+            filetypes=[("Excel files", "*.xlsx"), ("CSV files", "*.csv"), ("Parquet files", "*.parquet")],
+        )
         if not path:
             return
         try:
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Warehouse Transactions"
-            headers = ["Product", "Action", "Quantity", "Date/Time", "Stock After"]
-            ws.append(headers)
-            for cell in ws[1]:
-                cell.font = Font(bold=True)
-                cell.fill = PatternFill(start_color="FFFF99", end_color="FFFF99", fill_type="solid")
-            for prod in self.inventory.list_products():
-                current = 0
-                for entry in prod.transactions:
-                    act = entry["action"]
-                    qty = entry["quantity"]
-                    ts = entry["datetime"]
-                    if act in ("initial", "initial_replace"):
-                        current = qty
-                    elif act == "add":
-                        current += qty
-                    elif act == "sell":
-                        current -= qty
-                    ws.append([prod.name, act, qty, ts, current])
-            wb.save(path)
-            messagebox.showinfo("Export", f"Excel saved:\n{path}")
-        except Exception as exc:
-            logger.exception("Failed to export excel: %s", exc)
+            job = ExportJob(self.inventory, path)
+        except ValueError as exc:
             messagebox.showerror("Export Error", str(exc))
+            return
+        self._export_job = job
+        self.progress["value"] = 0.0
+        self.label_status.config(text="Exporting...")
+        self.btn_cancel.config(state=tk.NORMAL)
+        job.start()
+        self.after(100, self._poll_export)
+
+    def _poll_export(self):
+        """Update the progress bar until the export worker finishes."""
+        job = self._export_job
+        if job.total:
+            self.progress["value"] = job.done / job.total
+        if not job.finished.is_set():
+            self.label_status.config(text=f"Exporting... {job.done}/{job.total} rows")
+            self.after(100, self._poll_export)
+            return
+        self._export_job = None
+        self.progress["value"] = 0.0
+        self.label_status.config(text="")
+        self.btn_cancel.config(state=tk.DISABLED)
+        if job.cancelled:
+            messagebox.showinfo("Export", "Export cancelled.")
+        elif job.error is not None:
+            messagebox.showerror("Export Error", str(job.error))
+        else:
+            messagebox.showinfo("Export", f"File saved:\n{job.path}")
+
+    def on_quit(self):
+        """Quit; an import still being applied keeps the rows applied so far, saved as one undo entry."""
+        job = self._import_job
+        if job is not None:
+            self._import_job = None
+            logger.info("Quit during a CSV import; keeping the %d rows applied so far", job["rows"])
+            self.inventory.finish_import(job["undo"])
+        self.quit()
+
+    def on_cancel_job(self):
+        """Cancel the running export."""
+        if self._export_job is not None:
+            self._export_job.cancel()
+
+    def show_performance(self):
+        """Open a panel with the latency histograms collected by the instrumentation."""
+        inst = self.instrumentation
+        win = tk.Toplevel(self)
+        win.title("Performance")
+        win.geometry("640x400")
+        cols = ("operation", "calls", "p50", "p99", "max")
+        tree = ttk.Treeview(win, columns=cols, show="headings")
+        for col, width in zip(cols, (260, 80, 90, 90, 90)):
+            tree.heading(col, text=col if col in ("operation", "calls") else f"{col} (ms)")
+            tree.column(col, width=width, anchor=tk.W if col == "operation" else tk.E)
+        tree.pack(fill=tk.BOTH, expand=True, padx=6, pady=6)
+        label = ttk.Label(win)
+        label.pack(anchor=tk.W, padx=6)
+
+        def refresh():
+            """Reload the rows from the current histograms."""
+            tree.delete(*tree.get_children())
+            for name, count, p50, p99, worst in inst.summary():
+                tree.insert("", tk.END, values=(name, count, f"{p50 * 1e3:.2f}", f"{p99 * 1e3:.2f}", f"{worst * 1e3:.2f}"))
+            label.config(text=f"Saves: {inst.saves}, bytes written: {inst.save_bytes}")
+
+        buttons = ttk.Frame(win)
+        buttons.pack(fill=tk.X, padx=6, pady=6)
+        ttk.Button(buttons, text="Refresh", command=refresh).pack(side=tk.LEFT)
+        ttk.Button(buttons, text="Write to log", command=inst.write_log).pack(side=tk.LEFT, padx=6)
+        refresh()
 
     # ---------------- Save / Load / Undo / Redo ----------------
+    def on_compact_history(self):
+        """Roll old transactions into monthly summaries, archiving the raw entries."""
+        days = simpledialog.askinteger(
+            "Compact history", "Summarize transactions older than how many days?",
+            parent=self, initialvalue=90, minvalue=1,
+        )
+        if days is None:
+            return
+        archive = os.path.splitext(self.inventory.autosave_file)[0] + "_archive.jsonl"
+        removed = self.inventory.compact_history(days, "month", archive)
+        messagebox.showinfo("Compact history", f"Removed {removed} old entries.\nRaw entries archived to:\n{archive}")
+
     def _save_now(self):  # "AI"
         """Manually save inventory data to disk."""
         ok = self.inventory.save()
@@ -882,7 +3120,6 @@ class WarehouseApp(tk.Tk):  # "AI"
         if not ok:
             messagebox.showinfo("Undo", "Nothing to undo.")
             return
-        self.refresh_products_table()
         self.tree.selection_remove(self.tree.selection())
         messagebox.showinfo("Undo", "Undo applied.")
 
@@ -892,18 +3129,13 @@ class WarehouseApp(tk.Tk):  # "AI"
         if not ok:
             messagebox.showinfo("Redo", "Nothing to redo.")
             return
-        self.refresh_products_table()
         messagebox.showinfo("Redo", "Redo applied.")
 
     def on_clear_all(self):  # "AI"
         """Clear all products, transactions, and undo/redo stacks."""
         if not messagebox.askyesno("Clear All", "Remove all products and transactions?"):
             return
-        self.inventory.products.clear()
-        self.inventory.undo_stack.clear()
-        self.inventory.redo_stack.clear()
-        self.inventory.save()
-        self.refresh_products_table()
+        self.inventory.clear()
         messagebox.showinfo("Cleared", "All data removed.")
 
     def _manual_load(self):  # "AI"
@@ -915,16 +3147,68 @@ class WarehouseApp(tk.Tk):  # "AI"
             return
         ok = self.inventory.load()
         if ok:
-            self.refresh_products_table()
             messagebox.showinfo("Load", "Data loaded from disk.")
         else:
             messagebox.showerror("Load", "Failed to load. See console/log for details.")
 
 def main():
-    """Run WarehouseApp with a fresh Inventory instance."""
-    inv = Inventory()
-    app = WarehouseApp(inv)
-    app.mainloop()
+    """Run WarehouseApp with a fresh Inventory instance, or the headless service with --serve."""
+    parser = argparse.ArgumentParser(description="Warehouse manager")
+    parser.add_argument("--serve", action="store_true", help="run the headless HTTP/JSON service instead of the GUI")
+    parser.add_argument("--host", default="127.0.0.1", help="service address (default 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="service port (default 8765)")
+    parser.add_argument("--fast-start", action="store_true",
+                        help="show the window at once and load the catalog in the background")
+    parser.add_argument("--location", help="work on one warehouse location (see Warehouses) instead of the default file")
+    parser.add_argument("--instrument", action="store_true",
+                        help="time Inventory methods and GUI handlers; summary in warehouse_perf.log")
+    parser.add_argument("--profile", metavar="FILE", help="run under cProfile and write the stats to FILE on exit")
+    args = parser.parse_args()
+
+    profiler = None
+    if args.profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        _run(args)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            logger.info("Profile written to %s (view with: python -m pstats %s)", args.profile, args.profile)
+
+
+def _run(args: argparse.Namespace) -> None:
+    """Start the GUI or the service as selected on the command line."""
+    load_on_init = not (args.fast_start and not args.serve)
+    if args.location:
+        inv = Warehouses().open(args.location, load_on_init=load_on_init)
+    else:
+        inv = Inventory(load_on_init=load_on_init)
+    instrumentation = Instrumentation() if args.instrument else None
+    if instrumentation is not None:
+        instrumentation.instrument_inventory(inv)
+    try:
+        if args.serve:
+            server = make_server(inv, args.host, args.port)
+            logger.info("Warehouse service listening on http://%s:%d", args.host, args.port)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                server.server_close()
+                server.service.close()
+            return
+        app = WarehouseApp(inv, instrumentation)
+        if args.fast_start:
+            app.start_background_load()
+        app.mainloop()
+    finally:
+        if instrumentation is not None:
+            instrumentation.write_log()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,271 @@
+"""
+Synthetic-load benchmark for Inventory, without Tk.
+
+For each catalog size, builds a catalog with realistic transaction
+histories (a start quantity followed by random adds and sales spread
+over the last 90 days), saves it, and replays a mixed workload of
+add / sell / replace / remove / undo / redo / import operations through
+the public Inventory API. Every operation saves, as in the app, so the
+numbers are the baseline of today's JSON rewrite.
+
+Each size runs in its own interpreter so peak memory is per size.
+Results are printed (or written with --output) as JSON:
+
+  * ops_per_sec, p50/p99 latency overall and per operation (refused
+    operations such as selling more than is in stock are only counted
+    in failed_ops)
+  * saves and bytes written (total and per operation)
+  * peak resident memory (Unix only; null elsewhere)
+
+Usage:
+    python benchmarks/bench_inventory.py [--sizes 1000,10000,100000] [--ops 500]
+        [--mix add=35,sell=35,replace=10,remove=5,undo=6,redo=4,import=5] [--output results.json]
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Warehousing_app import Inventory, Product  # noqa: E402
+
+DEFAULT_MIX = "add=35,sell=35,replace=10,remove=5,undo=6,redo=4,import=5"
+IMPORT_ROWS = 100  # Rows per imported CSV, half of them existing products
+
+
+def parse_mix(text):
+    """Turn 'add=35,sell=35,...' into ([ops], [weights])."""
+    ops, weights = [], []
+    for part in text.split(","):
+        op, _, weight = part.partition("=")
+        ops.append(op.strip())
+        weights.append(float(weight))
+    return ops, weights
+
+
+def build_catalog(inv, skus, transactions, rng):
+    """Fill inv with skus products, each with a history of transactions entries."""
+    now = datetime.now()
+    for i in range(skus):
+        name = f"sku{i:07d}"
+        qty = rng.randint(50, 500)
+        start = now - timedelta(days=90)
+        history = [{"action": "initial", "quantity": qty, "datetime": start.isoformat(timespec="seconds")}]
+        for t in sorted(rng.random() * 90 for _ in range(transactions - 1)):
+            when = (start + timedelta(days=t)).isoformat(timespec="seconds")
+            if rng.random() < 0.3:
+                n = rng.randint(10, 100)
+                history.append({"action": "add", "quantity": n, "datetime": when})
+                qty += n
+            elif qty:
+                n = rng.randint(1, min(qty, 10))
+                history.append({"action": "sell", "quantity": n, "datetime": when})
+                qty -= n
+        inv.products[name] = Product.restore(name, qty, history)
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(len(sorted_values) * p / 100) - 1))]
+
+
+def latency_stats(seconds):
+    """Count and p50/p99 in milliseconds for a list of latencies."""
+    values = sorted(seconds)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1e3, 3),
+        "p99_ms": round(percentile(values, 99) * 1e3, 3),
+    }
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None where unavailable."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1e6 if sys.platform == "darwin" else 1e3), 1)  # bytes on macOS, KiB on Linux
+
+
+def run_size(skus, args):
+    """Benchmark one catalog size and return its result dict."""
+    rng = random.Random(args.seed)
+    ops, weights = parse_mix(args.mix)
+    with tempfile.TemporaryDirectory() as tmp:
+        inv = Inventory(os.path.join(tmp, "warehouse_data.json"), load_on_init=False)
+        start = time.perf_counter()
+        build_catalog(inv, skus, args.transactions, rng)
+        inv.finish_load((inv.products, None))  # Build the search index like a real load
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        inv.save()
+        initial_save = time.perf_counter() - start
+        initial_bytes = inv.last_save_bytes
+
+        saves = [0, 0]  # count, bytes
+        plain_save = inv.save
+
+        def counting_save():
+            ok = plain_save()
+            if ok:
+                saves[0] += 1
+                saves[1] += inv.last_save_bytes
+            return ok
+        inv.save = counting_save
+
+        # Names the workload picks from, kept in step with inv.products so
+        # sell / replace / remove target products that exist. Removed names are
+        # remembered because undo / redo can bring them back.
+        names = list(inv.products)
+        position = {name: i for i, name in enumerate(names)}
+        gone = set()
+
+        def forget(name):
+            i = position.pop(name)
+            last = names.pop()
+            if last != name:
+                names[i] = last
+                position[last] = i
+            gone.add(name)
+
+        def remember(candidates):
+            for name in candidates:
+                if name not in position and name in inv.products:
+                    position[name] = len(names)
+                    names.append(name)
+                    gone.discard(name)
+
+        def pick():
+            while True:  # Drop names an undo / redo has taken away since
+                name = rng.choice(names)
+                if name in inv.products:
+                    return name
+                forget(name)
+
+        csv_path = os.path.join(tmp, "import.csv")
+        latencies = {op: [] for op in ops}
+        every = []
+        failed = {op: 0 for op in ops}
+        new_id = 0
+        deadline = time.perf_counter() + args.max_seconds
+        for _ in range(args.ops):
+            if time.perf_counter() > deadline:
+                break
+            op = rng.choices(ops, weights)[0]
+            name = pick()
+            imported = []
+            if op == "import":
+                with open(csv_path, "w", encoding="utf-8", newline="") as f:
+                    f.write("name,quantity\n")
+                    for r in range(IMPORT_ROWS):
+                        if r % 2:
+                            f.write(f"{rng.choice(names)},{rng.randint(0, 500)}\n")
+                        else:
+                            imported.append(f"new{new_id}")
+                            f.write(f"{imported[-1]},{rng.randint(0, 500)}\n")
+                            new_id += 1
+            start = time.perf_counter()
+            if op == "add":
+                ok = inv.add_stock(name, rng.randint(1, 50))
+            elif op == "sell":
+                ok = inv.sell_stock(name, rng.randint(1, 5))
+            elif op == "replace":
+                inv.add_or_replace_product(name, rng.randint(0, 500))
+                ok = True  # Always applies; the returned flag only says whether it was new
+            elif op == "remove":
+                ok = inv.remove_product(name)
+            elif op == "undo":
+                ok = inv.undo()
+            elif op == "redo":
+                ok = inv.redo()
+            elif op == "import":
+                ok = sum(inv.import_from_csv(csv_path)) > 0
+            else:
+                raise SystemExit(f"unknown operation in --mix: {op}")
+            elapsed = time.perf_counter() - start
+            if op == "remove" and ok:
+                forget(name)
+            elif op in ("undo", "redo"):
+                remember(list(gone))
+            elif op == "import":
+                remember(imported)
+            # A refused operation (selling more than is in stock, nothing to
+            # undo, ...) did no real work; counting it would inflate ops/sec
+            if not ok:
+                failed[op] += 1
+                continue
+            latencies[op].append(elapsed)
+            every.append(elapsed)
+
+        total = sum(every)
+        return {
+            "skus": skus,
+            "transactions_per_sku": args.transactions,
+            "build_s": round(build, 3),
+            "initial_save_s": round(initial_save, 3),
+            "initial_save_bytes": initial_bytes,
+            "ops": len(every),
+            "failed_ops": {op: n for op, n in failed.items() if n},
+            "elapsed_s": round(total, 3),
+            "ops_per_sec": round(len(every) / total, 1) if total else None,
+            "latency": latency_stats(every),
+            "per_op": {op: latency_stats(values) for op, values in latencies.items() if values},
+            "saves": saves[0],
+            "save_bytes": saves[1],
+            "save_bytes_per_op": round(saves[1] / len(every)) if every else 0,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated catalog sizes (up to 1000000)")
+    parser.add_argument("--transactions", type=int, default=20, help="history entries per product")
+    parser.add_argument("--ops", type=int, default=500, help="operations replayed per size")
+    parser.add_argument("--max-seconds", type=float, default=120, help="stop a size's workload after this long")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation weights")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON here instead of stdout")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)  # Worker mode: one size, JSON on stdout
+    args = parser.parse_args()
+
+    if args.single is not None:
+        print(json.dumps(run_size(args.single, args)))
+        return
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        cmd = [sys.executable, os.path.abspath(__file__), "--single", str(size),
+               "--transactions", str(args.transactions), "--ops", str(args.ops),
+               "--max-seconds", str(args.max_seconds), "--mix", args.mix, "--seed", str(args.seed)]
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        print(f"{size} SKUs: {results[-1]['ops_per_sec']} ops/sec", file=sys.stderr)
+
+    report = {
+        "benchmark": "inventory",
+        "python": sys.version.split()[0],
+        "mix": args.mix,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
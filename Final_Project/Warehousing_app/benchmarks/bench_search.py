@@ -0,0 +1,102 @@
+"""
+Keystroke-to-render latency benchmark for the warehouse search box.
+
+Builds synthetic catalogs, types a query one character at a time and
+times what the GUI does on every <KeyRelease>: filter the rows through
+the search index and materialize the visible window. The old linear
+scan (sorted() + `search in name` over every product) is timed too.
+
+Runs headless, no Tk window is opened.
+
+Usage:
+    python benchmarks/bench_search.py [--sizes 10000 100000 1000000] [--query "steel bolt 12"]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Warehousing_app import ProductListModel, SearchIndex  # noqa: E402
+
+ADJECTIVES = ["steel", "brass", "plastic", "red", "blue", "green", "large", "small", "heavy", "light"]
+NOUNS = ["bolt", "nut", "washer", "screw", "hinge", "bracket", "pipe", "valve", "cable", "spring"]
+VISIBLE_ROWS = 30  # Rows materialized by the product table
+
+
+class _CatalogStub:
+    """Just enough of Inventory for ProductListModel: a search index and search()."""
+
+    def __init__(self, names):
+        self.search_index = SearchIndex(names)
+
+    def search(self, query):
+        return self.search_index.search(query)
+
+
+def make_names(count, seed=0):
+    """Generate count unique product names like 'steel bolt 12345'."""
+    rng = random.Random(seed)
+    return [f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}" for i in range(count)]
+
+
+def time_keystrokes(fn, query):
+    """Call fn with each prefix of query and return the per-keystroke latencies in ms."""
+    latencies = []
+    for end in range(1, len(query) + 1):
+        start = time.perf_counter()
+        fn(query[:end])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def bench(size, query):
+    """Benchmark one catalog size and return a result row."""
+    names = make_names(size)
+
+    start = time.perf_counter()
+    catalog = _CatalogStub(names)
+    build_s = time.perf_counter() - start
+
+    model = ProductListModel(catalog)
+
+    def indexed(text):
+        model.set_search(text)
+        model.window(VISIBLE_ROWS)
+
+    def linear(text):
+        rows = [name for name in sorted(names) if text in name]
+        rows[:VISIBLE_ROWS]
+
+    fast = time_keystrokes(indexed, query)
+    slow = time_keystrokes(linear, query)
+    return {
+        "size": size,
+        "build_s": build_s,
+        "index_median_ms": statistics.median(fast),
+        "index_max_ms": max(fast),
+        "linear_median_ms": statistics.median(slow),
+        "linear_max_ms": max(slow),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--query", default="steel bolt 12")
+    args = parser.parse_args()
+
+    print(f"query: {args.query!r}, visible rows: {VISIBLE_ROWS}")
+    print(f"{'products':>10} {'build s':>8} {'index med ms':>13} {'index max ms':>13} "
+          f"{'linear med ms':>14} {'linear max ms':>14}")
+    for size in args.sizes:
+        r = bench(size, args.query)
+        print(f"{r['size']:>10} {r['build_s']:>8.2f} {r['index_median_ms']:>13.3f} {r['index_max_ms']:>13.3f} "
+              f"{r['linear_median_ms']:>14.3f} {r['linear_max_ms']:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
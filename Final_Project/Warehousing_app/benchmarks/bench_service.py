@@ -0,0 +1,100 @@
+"""
+Load test for the headless warehouse service.
+
+Starts the HTTP/JSON service in-process on a free port with a temporary
+data file, then lets several client threads (stations) post add and
+sell requests at the same time over keep-alive connections. Reports
+operations per second and checks that no update was lost: every
+product's final quantity must equal its start quantity plus all
+successful adds minus all successful sells.
+
+Usage:
+    python benchmarks/bench_service.py [--products 200] [--clients 16] [--ops 500]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Warehousing_app import Inventory, Product, make_server  # noqa: E402
+
+START_QTY = 1000
+
+
+def client(port, names, ops, seed, totals, lock):
+    """Post ops random add/sell requests and tally the successful ones."""
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    local = {}
+    for _ in range(ops):
+        name = rng.choice(names)
+        action = rng.choice(("add", "sell"))
+        qty = rng.randint(1, 5)
+        conn.request("POST", f"/products/{name}/{action}", body=json.dumps({"qty": qty}),
+                     headers={"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        resp.read()
+        if resp.status == 200:
+            local[name] = local.get(name, 0) + (qty if action == "add" else -qty)
+        elif resp.status != 409:
+            raise RuntimeError(f"unexpected status {resp.status}")
+    conn.close()
+    with lock:
+        for name, delta in local.items():
+            totals[name] = totals.get(name, 0) + delta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=500, help="requests per client")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inv = Inventory(os.path.join(tmp, "warehouse_data.json"))
+        names = [f"sku{i}" for i in range(args.products)]
+        for name in names:
+            inv.products[name] = Product(name, START_QTY)
+        inv.save()
+
+        server = make_server(inv, port=0)
+        port = server.server_address[1]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        totals, lock = {}, threading.Lock()
+        threads = [
+            threading.Thread(target=client, args=(port, names, args.ops, seed, totals, lock))
+            for seed in range(args.clients)
+        ]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        server.shutdown()
+        server.service.close()
+        server.server_close()
+
+        total_ops = args.clients * args.ops
+        lost = [n for n in names if inv.products[n].quantity != START_QTY + totals.get(n, 0)]
+        saved = Inventory(os.path.join(tmp, "warehouse_data.json"))
+        unsaved = [n for n in names if saved.products[n].quantity != inv.products[n].quantity]
+        print(f"{total_ops} requests from {args.clients} clients in {elapsed:.2f} s "
+              f"-> {total_ops / elapsed:.0f} ops/sec")
+        print(f"lost updates: {len(lost)}, products differing on disk: {len(unsaved)}")
+        if lost or unsaved:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
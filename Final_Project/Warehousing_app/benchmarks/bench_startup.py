@@ -0,0 +1,93 @@
+"""
+Startup-time benchmark for the warehousing app.
+
+Writes a large warehouse_data.json (plus the quantities file the app
+keeps next to it) to a temporary directory and measures, without
+opening a Tk window:
+
+  * import time of Warehousing_app in a fresh interpreter
+  * eager start: Inventory() loading and deserializing the full file
+  * fast start: time until names and quantities are available
+    (load_quantities) and until histories are hydrated (read_saved +
+    finish_load, which the GUI runs on a worker thread)
+
+Usage:
+    python benchmarks/bench_startup.py [--products 100000] [--transactions 20]
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from Warehousing_app import Inventory, Product  # noqa: E402
+
+
+def write_catalog(path, products, transactions):
+    """Save a synthetic catalog through Inventory so both data files are written."""
+    inv = Inventory(path, load_on_init=False)
+    for i in range(products):
+        history = [{"action": "initial", "quantity": 100, "datetime": "2025-01-01T09:00:00"}]
+        history += [
+            {"action": "sell" if t % 2 else "add", "quantity": 1, "datetime": "2025-01-02T10:00:00"}
+            for t in range(transactions - 1)
+        ]
+        inv.products[f"item {i}"] = Product.restore(f"item {i}", 100, history)
+    inv.save()
+
+
+def timed(fn):
+    """Return (result, seconds) for fn()."""
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def import_time():
+    """Seconds to import the app module in a fresh interpreter."""
+    code = "import time; t = time.perf_counter(); import Warehousing_app; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=APP_DIR, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--transactions", type=int, default=20, help="history entries per product")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "warehouse_data.json")
+        write_catalog(path, args.products, args.transactions)
+        size_mb = os.path.getsize(path) / 1e6
+
+        eager_inv, eager = timed(lambda: Inventory(path))
+        del eager_inv  # Do not let the first catalog slow the garbage collector during the next run
+        gc.collect()
+
+        inv = Inventory(path, load_on_init=False)
+        _, first = timed(inv.load_quantities)
+        data, parse = timed(inv.read_saved)
+        _, install = timed(lambda: inv.finish_load(data))
+
+        result = {
+            "products": args.products,
+            "transactions_per_product": args.transactions,
+            "file_mb": round(size_mb, 1),
+            "import_s": round(import_time(), 3),
+            "eager_load_s": round(eager, 3),
+            "fast_quantities_s": round(first, 3),
+            "fast_background_parse_s": round(parse, 3),
+            "fast_install_s": round(install, 3),
+        }
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import argparse
+import math
+import sys
+
+# Same coins as cash.py: quarters, dimes, nickels and pennies (in cents)
+US_COINS = (25, 10, 5, 1)
+
+
+class CoinChanger:
+    """
+    Fewest-coins change for any set of denominations.
+
+    Greedy (largest coin first, as in cash.py) is only right for
+    "canonical" coin systems such as 25/10/5/1. For others, e.g. 4/3/1
+    where 6 = 3 + 3 and not 4 + 1 + 1, answers come from a dynamic
+    programming table built once per coin system. The table only needs
+    to reach (largest - 1) * second largest coin: above that an optimal
+    answer always contains the largest coin, so bigger amounts are
+    reduced by largest coins first.
+    """
+
+    def __init__(self, denominations=US_COINS):
+        coins = sorted(set(int(c) for c in denominations), reverse=True)
+        if not coins or coins[-1] < 1:
+            raise ValueError("denominations must be positive integers")
+        if coins[-1] != 1:
+            raise ValueError("denominations must include 1 so every amount can be paid")
+        self.coins = tuple(coins)
+        # Above this amount an optimal answer always uses the largest coin
+        self.limit = (coins[0] - 1) * coins[1] if len(coins) > 1 else 0
+        self._fewest = None  # fewest[a]: coins needed for amount a (DP table)
+        self._last = None    # last[a]: index of a coin used in an optimal answer for a
+        self.canonical = self._check_canonical()
+        self._table_counts = None  # Per-coin counts for every amount in the table (NumPy)
+
+    def _build_table(self):
+        """Fill the DP tables for amounts 0..limit (done once, on first need)."""
+        if self._fewest is not None:
+            return
+        size = self.limit + 1
+        fewest = [0] * size
+        last = [0] * size
+        for amount in range(1, size):
+            best = amount + 1
+            for i, coin in enumerate(self.coins):
+                if coin <= amount and fewest[amount - coin] + 1 < best:
+                    best = fewest[amount - coin] + 1
+                    last[amount] = i
+            fewest[amount] = best
+        self._fewest = fewest
+        self._last = last
+
+    def _check_canonical(self):
+        """True if greedy gives the fewest coins for every amount (checking up to the table limit is enough)."""
+        if len(self.coins) <= 2:
+            return True  # {c, 1} is always canonical
+        self._build_table()
+        return all(sum(self._greedy(a)) == self._fewest[a] for a in range(self.limit + 1))
+
+    def _greedy(self, amount):
+        """Per-coin counts taking the largest coin first."""
+        counts = []
+        for coin in self.coins:
+            counts.append(amount // coin)
+            amount %= coin
+        return counts
+
+    def counts(self, amount):
+        """Return how many of each coin (largest first) pay the amount with the fewest coins."""
+        amount = int(amount)
+        if amount < 0:
+            raise ValueError("amount must not be negative")
+        if self.canonical:
+            return self._greedy(amount)
+        counts = [0] * len(self.coins)
+        if amount > self.limit:
+            # Use largest coins until the rest is inside the table
+            extra = -(-(amount - self.limit) // self.coins[0])
+            counts[0] = extra
+            amount -= extra * self.coins[0]
+        while amount:
+            i = self._last[amount]
+            counts[i] += 1
+            amount -= self.coins[i]
+        return counts
+
+    def total(self, amount):
+        """Return the fewest number of coins that pay the amount."""
+        return sum(self.counts(amount))
+
+    def counts_many(self, amounts):
+        """
+        Per-coin counts for many amounts at once.
+
+        amounts: Sequence or NumPy array of non-negative integer amounts
+        Returns an (n, number of coins) NumPy array when NumPy is
+        installed, otherwise a list of lists.
+        """
+        try:
+            import numpy as np
+        except ImportError:
+            return [self.counts(a) for a in amounts]
+
+        rest = np.asarray(amounts, dtype=np.int64)
+        if rest.size and rest.min() < 0:
+            raise ValueError("amounts must not be negative")
+        result = np.zeros((rest.size, len(self.coins)), dtype=np.int64)
+        if self.canonical:
+            # Floor-division / modulo chain, one pass per coin
+            for i, coin in enumerate(self.coins):
+                result[:, i], rest = np.divmod(rest, coin)
+            return result
+        if self._table_counts is None:
+            table = np.zeros((self.limit + 1, len(self.coins)), dtype=np.int64)
+            for amount in range(self.limit + 1):
+                table[amount] = self.counts(amount)
+            self._table_counts = table
+        extra = np.maximum(0, -(-(rest - self.limit) // self.coins[0]))
+        result[:] = self._table_counts[rest - extra * self.coins[0]]
+        result[:, 0] += extra
+        return result
+
+
+def read_cents(stream):
+    """
+    Read whitespace-separated dollar amounts and return them in cents.
+
+    Raises ValueError for anything that is not a finite number ("inf", "nan", ...)
+    and, with NumPy, for amounts too large for 64-bit cents.
+    """
+    words = stream.read().split()
+    try:
+        import numpy as np
+    except ImportError:
+        cents = []
+        for w in words:
+            amount = float(w) * 100
+            if not math.isfinite(amount):
+                raise ValueError(f"not a finite amount: {w!r}")
+            cents.append(round(amount))
+        return cents
+    with np.errstate(over="ignore"):  # Overflow to inf is reported below
+        amounts = np.array(words, dtype=np.float64) * 100
+    bad = ~np.isfinite(amounts) | (np.abs(amounts) >= 2.0 ** 63)
+    if bad.any():
+        raise ValueError(f"amount is not finite or too large: {words[int(np.argmax(bad))]!r}")
+    return np.rint(amounts).astype(np.int64)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fewest coins for many amounts of change.")
+    parser.add_argument("file", nargs="?", default="-", help="amounts in dollars, one per line ('-' = standard input)")
+    parser.add_argument("--coins", default=",".join(map(str, US_COINS)), help="denominations in cents (default 25,10,5,1)")
+    parser.add_argument("--per-coin", action="store_true", help="print how many of each coin instead of the total")
+    args = parser.parse_args()
+
+    try:
+        changer = CoinChanger(int(c) for c in args.coins.split(","))
+        if args.file == "-":
+            cents = read_cents(sys.stdin)
+        else:
+            with open(args.file) as f:
+                cents = read_cents(f)
+        counts = changer.counts_many(cents)
+    except ValueError as exc:
+        print(f"Error: {exc}")
+        sys.exit(1)
+
+    if args.per_coin:
+        print(",".join(map(str, changer.coins)))
+        lines = (",".join(map(str, row)) for row in counts.tolist()) if hasattr(counts, "tolist") \
+            else (",".join(map(str, row)) for row in counts)
+    else:
+        totals = counts.sum(axis=1).tolist() if hasattr(counts, "sum") else [sum(row) for row in counts]
+        lines = map(str, totals)
+    # One big write instead of a print per amount
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    main()
+
+# Mohammadreza_mokhtari_kia
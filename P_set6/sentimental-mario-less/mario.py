@@ -1,16 +1,51 @@
-while True:
-    try:
-        number = int(input("Height: "))  # Geting a number(Height) from user
-        if (1 <= number <= 8):  # Check if it is between 1 and 8
-            break  # True input, exits the loop
-    except ValueError:
-        pass  # If the input was non-numeric, prompt the user again
-
-for i in range(1, number + 1):  # Outer ring: every line
-    for j in range(number - i):  # Print spaces
-        print(" ", end="")  # Print a space without going to the next line
-    for k in range(i):  # Print '#'
-        print("#", end="")  # Print a '#' without going to the next line
-    print("")  # Go to the next line after printing all spaces and '#'s on that line
+import functools
+import sys
+
+BLOCK_SIZE = 1 << 22  # Write tall pyramids about 4 MiB at a time
+
+
+@functools.lru_cache(maxsize=32)
+def pyramid(height):
+    """Return the whole right-aligned pyramid as one string, built once per height."""
+    # Row i is (height - i) spaces and i '#', i.e. a slice of one long row
+    template = " " * (height - 1) + "#" * height
+    return "".join(template[i:i + height] + "\n" for i in range(height))
+
+
+def render(height, out=sys.stdout):
+    """Write a pyramid of any height in large buffered blocks."""
+    if height * (height + 1) <= BLOCK_SIZE:
+        out.write(pyramid(height))  # Small enough for a single write
+        return
+    template = " " * (height - 1) + "#" * height
+    rows_per_block = max(1, BLOCK_SIZE // (height + 1))
+    for start in range(0, height, rows_per_block):
+        stop = min(height, start + rows_per_block)
+        out.write("".join(template[i:i + height] + "\n" for i in range(start, stop)))
+
+
+def main():
+    # Non-interactive mode: python mario.py --height N (no 1-8 limit)
+    if len(sys.argv) > 1:
+        if len(sys.argv) != 3 or sys.argv[1] != "--height" or not sys.argv[2].isdigit() or int(sys.argv[2]) < 1:
+            print("Usage: python mario.py [--height N]")
+            sys.exit(1)
+        render(int(sys.argv[2]))
+        return
+
+    while True:
+        try:
+            number = int(input("Height: "))  # Geting a number(Height) from user
+            if (1 <= number <= 8):  # Check if it is between 1 and 8
+                break  # True input, exits the loop
+        except ValueError:
+            pass  # If the input was non-numeric, prompt the user again
+
+    # Every line at once: spaces, then '#', built with string slicing
+    render(number)
+
+
+if __name__ == "__main__":
+    main()
 
 # Mohammadreza_mokhtari_kia
@@ -0,0 +1,182 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from readability import analyze_stream, coleman_liau, grade_label
+
+PART_SIZE = 32 << 20  # Large files are split into parts of about 32 MiB
+SCAN_SIZE = 64 << 10  # How far to look for a sentence end after a split point
+
+# End of a sentence: '.', '!' or '?' followed by whitespace
+SENTENCE_END = re.compile(rb"[.!?][ \t\n\r\x0b\x0c]")
+SPACE = re.compile(rb"[ \t\n\r\x0b\x0c]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score the readability of many documents in parallel.")
+    parser.add_argument("paths", nargs="+", help="files, directories or glob patterns")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes (default: all cores)")
+    parser.add_argument("--format", choices=("csv", "json"), default="csv")
+    parser.add_argument("--output", help="write results here instead of standard output")
+    parser.add_argument("--part-size", type=int, default=PART_SIZE, help="bytes per part of a large file")
+    args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.part_size < 1:
+        parser.error("--part-size must be at least 1")
+
+    documents = find_documents(args.paths)
+    if not documents:
+        print("No documents found")
+        sys.exit(1)
+
+    results = score_documents(documents, args.jobs, args.part_size)
+
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        write_results(results, args.format, out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    # Unreadable documents are listed in the results; the exit status tells scripts
+    if any(result["error"] for result in results):
+        sys.exit(1)
+
+
+def find_documents(paths):
+    """Expand files, directories (recursively) and glob patterns into a sorted list of files."""
+    found = set()
+    for path in paths:
+        matches = glob.glob(path, recursive=True) if glob.has_magic(path) else [path]
+        for match in matches:
+            if os.path.isdir(match):
+                for root, _, files in os.walk(match):
+                    found.update(os.path.join(root, name) for name in files)
+            elif os.path.isfile(match):
+                found.add(match)
+    return sorted(found)
+
+
+def split_points(path, part_size):
+    """
+    Offsets that cut a file into parts of about part_size bytes.
+
+    Each cut is placed just after the whitespace that follows a sentence
+    end (or at least after some whitespace), so no word is split and the
+    counts of the parts add up to the counts of the whole file.
+    """
+    size = os.path.getsize(path)
+    points = [0]
+    with open(path, "rb") as f:
+        pos = part_size
+        while pos < size:
+            f.seek(pos)
+            window = f.read(SCAN_SIZE)
+            match = SENTENCE_END.search(window) or SPACE.search(window)
+            if match is None:
+                pos += len(window)  # No whitespace nearby, keep looking
+                continue
+            pos += match.end()
+            if pos < size:
+                points.append(pos)
+            pos += part_size
+    points.append(size)
+    return points
+
+
+class RangeReader:
+    """Read-only view of the bytes between two offsets of an open file."""
+
+    def __init__(self, f, start, end):
+        f.seek(start)
+        self.f = f
+        self.left = end - start
+
+    def read(self, n):
+        data = self.f.read(min(n, self.left))
+        self.left -= len(data)
+        return data
+
+
+def count_part(task):
+    """
+    Count (letters, words, sentences) of one part of a file; runs in a worker process.
+
+    Returns (path, counts, error): counts is None and error a message if
+    the file could not be read.
+    """
+    path, start, end = task
+    try:
+        with open(path, "rb") as f:
+            return path, analyze_stream(RangeReader(f, start, end)), None
+    except OSError as exc:
+        return path, None, exc.strerror or str(exc)
+
+
+def score_documents(documents, jobs, part_size=PART_SIZE):
+    """
+    Count all parts of all documents in a process pool and add them up per document.
+
+    A document that cannot be read (vanished, no permission, ...) does not
+    stop the run: its row has no counts and says why in "error".
+    """
+    tasks = []
+    errors = {}
+    for path in documents:
+        try:
+            points = split_points(path, part_size)
+        except OSError as exc:
+            errors[path] = exc.strerror or str(exc)
+            continue
+        tasks.extend((path, start, end) for start, end in zip(points, points[1:]))
+
+    totals = {path: [0, 0, 0] for path in documents}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        # Many small documents are sent to the workers in groups
+        for path, counts, error in pool.map(count_part, tasks, chunksize=max(1, len(tasks) // (jobs * 8))):
+            if error is not None:
+                errors.setdefault(path, error)
+                continue
+            for i, n in enumerate(counts):
+                totals[path][i] += n
+
+    results = []
+    for path in documents:
+        if path in errors:
+            results.append({"document": path, "letters": None, "words": None, "sentences": None,
+                            "index": None, "grade": None, "error": errors[path]})
+            continue
+        letters, words, sentences = totals[path]
+        index = coleman_liau(letters, words, sentences) if words else None
+        results.append({
+            "document": path,
+            "letters": letters,
+            "words": words,
+            "sentences": sentences,
+            "index": round(index, 2) if index is not None else None,
+            "grade": grade_label(index) if index is not None else "No words",
+            "error": "",
+        })
+    return results
+
+
+def write_results(results, fmt, out):
+    """Write the per-document results as CSV or JSON."""
+    if fmt == "json":
+        json.dump(results, out, indent=2)
+        out.write("\n")
+        return
+    writer = csv.DictWriter(out, fieldnames=["document", "letters", "words", "sentences", "index", "grade", "error"])
+    writer.writeheader()
+    writer.writerows(results)
+
+
+if __name__ == "__main__":
+    main()
+
+# Mohammadreza_mokhtari_kia
@@ -0,0 +1,189 @@
+"""
+Benchmark of the readability counting kernels.
+
+Times several ways of counting (letters, words, sentences):
+
+  * original     count_letters + count_words + count_sentences (three passes)
+  * single_pass  one Python loop over the characters
+  * regex        re.findall for letters, words and sentence marks
+  * translate    readability.count_chunk (bytes.translate / split / count)
+  * stream       readability.analyze_stream, 1 MiB chunks
+  * numpy        byte histogram with numpy.bincount (skipped if NumPy is missing)
+
+on every text in P_set5/speller/texts and on a synthetic text of
+--synthetic-mb megabytes. Reports MB/s per kernel and checks that every
+kernel gives the same counts and grade as the original one; the exit
+status is 1 if any differs.
+
+Usage:
+    python benchmarks/bench_kernels.py [--synthetic-mb 200] [--skip original,single_pass] [--json]
+"""
+import argparse
+import io
+import json
+import os
+import random
+import re
+import sys
+import time
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, HERE)
+
+from readability import (  # noqa: E402
+    NON_LETTERS, WHITESPACE, analyze_stream, coleman_liau, count_chunk,
+    count_letters, count_sentences, count_words, grade_label,
+)
+
+SPELLER_TEXTS = os.path.join(HERE, "..", "..", "P_set5", "speller", "texts")
+
+LETTER = re.compile(r"[^\W\d_]")
+WORD = re.compile(r"\S+")
+MARK = re.compile(r"[.!?]")
+
+
+def original(text, data):
+    return count_letters(text), count_words(text), count_sentences(text)
+
+
+def single_pass(text, data):
+    letters = words = sentences = 0
+    in_word = False
+    for ch in text:
+        if ch.isspace():
+            in_word = False
+            continue
+        if not in_word:
+            words += 1
+            in_word = True
+        if ch.isalpha():
+            letters += 1
+        elif ch in ".!?":
+            sentences += 1
+    return letters, words, sentences
+
+
+def regex(text, data):
+    return len(LETTER.findall(text)), len(WORD.findall(text)), len(MARK.findall(text))
+
+
+def translate(text, data):
+    return count_chunk(data)
+
+
+def stream(text, data):
+    return analyze_stream(io.BytesIO(data))
+
+
+def make_numpy_kernel():
+    """Return the NumPy kernel, or None if NumPy is not installed."""
+    try:
+        import numpy as np
+    except ImportError:
+        return None
+
+    letter_bytes = np.ones(256, dtype=bool)
+    letter_bytes[np.frombuffer(NON_LETTERS, dtype=np.uint8)] = False
+    space_bytes = np.zeros(256, dtype=bool)
+    space_bytes[np.frombuffer(WHITESPACE, dtype=np.uint8)] = True
+
+    def numpy_histogram(text, data):
+        arr = np.frombuffer(data, dtype=np.uint8)
+        hist = np.bincount(arr, minlength=256)
+        letters = int(hist[letter_bytes].sum())
+        if not data.isascii():
+            letters += sum(1 for ch in text if ord(ch) > 127 and ch.isalpha())
+        sentences = int(hist[ord(".")] + hist[ord("!")] + hist[ord("?")])
+        # A word starts wherever a non-space byte follows a space (or the start)
+        space = space_bytes[arr]
+        starts = ~space
+        starts[1:] &= space[:-1]
+        return letters, int(starts.sum()), sentences
+
+    return numpy_histogram
+
+
+def synthetic_text(megabytes, seed=1):
+    """Random English-like text of about the given size."""
+    rng = random.Random(seed)
+    vocab = ("the of and to in is was he for it with as his on be at by had are but from or have an they "
+             "which one you were her all she there would their we him been has when who will more no if "
+             "out so said what up its about into than them can only other new some could time these two").split()
+    ends = [". ", "! ", "? ", ", ", " ", " ", " ", " ", "\n"]
+    sentence = []
+    for _ in range(5000):
+        sentence.append(rng.choice(vocab).capitalize() if rng.random() < 0.1 else rng.choice(vocab))
+        sentence.append(rng.choice(ends))
+    block = "".join(sentence)
+    return block * max(1, int(megabytes * 1e6 // len(block)))
+
+
+def inputs(args):
+    """Yield (name, text) for the speller texts and the synthetic text."""
+    if os.path.isdir(SPELLER_TEXTS):
+        for name in sorted(os.listdir(SPELLER_TEXTS)):
+            with open(os.path.join(SPELLER_TEXTS, name), encoding="utf-8", errors="replace") as f:
+                yield f"speller/{name}", f.read()
+    if args.synthetic_mb > 0:
+        yield f"synthetic {args.synthetic_mb} MB", synthetic_text(args.synthetic_mb)
+
+
+def grade(counts):
+    letters, words, sentences = counts
+    return grade_label(coleman_liau(letters, words, sentences)) if words else "no words"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--synthetic-mb", type=float, default=200, help="size of the synthetic text (0 to skip)")
+    parser.add_argument("--skip", default="", help="comma-separated kernels to leave out of the timings")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    kernels = {
+        "original": original,
+        "single_pass": single_pass,
+        "regex": regex,
+        "translate": translate,
+        "stream": stream,
+        "numpy": make_numpy_kernel(),
+    }
+    skip = set(filter(None, args.skip.split(",")))
+    results = []
+    mismatches = 0
+    for name, text in inputs(args):
+        data = text.encode("utf-8")
+        mb = len(data) / 1e6
+        # Every kernel is checked against the original counts, even when the original is not timed
+        reference = original(text, data)
+        for kernel_name, kernel in kernels.items():
+            if kernel is None or kernel_name in skip:
+                continue
+            start = time.perf_counter()
+            counts = kernel(text, data)
+            elapsed = time.perf_counter() - start
+            same = counts == reference and grade(counts) == grade(reference)
+            mismatches += not same
+            results.append({
+                "input": name,
+                "kernel": kernel_name,
+                "mb": round(mb, 3),
+                "seconds": round(elapsed, 4),
+                "mb_per_s": round(mb / elapsed, 1) if elapsed else None,
+                "counts": list(counts),
+                "grade": grade(counts),
+                "matches": same,
+            })
+            if not args.json:
+                print(f"{name:<28} {kernel_name:<12} {results[-1]['mb_per_s'] or 0:>9.1f} MB/s  "
+                      f"{counts}  {'ok' if same else 'MISMATCH'}")
+        if kernels["numpy"] is None and not args.json:
+            print(f"{name:<28} numpy        skipped (NumPy not installed)")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
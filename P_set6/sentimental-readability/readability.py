@@ -1,5 +1,17 @@
 # Importing string module for letter checking
 import string
+import sys
+from collections import deque
+from math import gcd
+
+# Bytes that are not ASCII letters, deleted by bytes.translate so only letters remain
+NON_LETTERS = bytes(b for b in range(256) if not chr(b).isascii() or not chr(b).isalpha())
+
+# ASCII whitespace, where a chunk of a file can be cut without splitting a word
+WHITESPACE = b" \t\n\r\x0b\x0c"
+
+CHUNK_SIZE = 1 << 20  # Read files 1 MiB at a time
+
 
 def count_sentences(text):
     """Count the number of sentences in the text."""
@@ -26,29 +38,206 @@ def count_letters(text):
             letters += 1  # Adds to the word
     return letters
 
-# Prompt user for input text
-user_text = input("Text: ")
 
-# Count letters, words, and sentences
-total_letters = count_letters(user_text)
-total_words = count_words(user_text)
-total_sentences = count_sentences(user_text)
+def coleman_liau(letters, words, sentences):
+    """Return the Coleman-Liau index for the given counts."""
+    # Calculate averages per 100 words
+    avg_letters = (letters / words) * 100
+    avg_sentences = (sentences / words) * 100
+    return 0.0588 * avg_letters - 0.296 * avg_sentences - 15.8
+
+
+def grade_label(index):
+    """Turn a Coleman-Liau index into the text that is printed."""
+    if index < 1:
+        return "Before Grade 1"
+    if index > 16:
+        return "Grade 16+"
+    return f"Grade {round(index)}"
+
+
+def count_chunk(chunk):
+    """
+    Count (letters, words, sentences) in a piece of UTF-8 text, all in one go.
+
+    The piece must start and end at a word boundary (see iter_chunks), so
+    the counts of consecutive pieces can simply be added up.
+    """
+    # Deleting every non-letter byte leaves just the ASCII letters
+    letters = len(chunk.translate(None, NON_LETTERS))
+    if not chunk.isascii():
+        # Rare non-ASCII letters (é, ß, ...) still count, like str.isalpha() does
+        letters += sum(1 for ch in chunk.decode("utf-8", "replace") if ord(ch) > 127 and ch.isalpha())
+    words = len(chunk.split())
+    sentences = chunk.count(b".") + chunk.count(b"!") + chunk.count(b"?")
+    return letters, words, sentences
+
+
+def iter_chunks(stream, chunk_size=CHUNK_SIZE):
+    """
+    Read a binary stream in pieces that end at whitespace.
+
+    Cutting at whitespace never splits a word or a UTF-8 character, so
+    memory stays at about one chunk however long the text is.
+    """
+    rest = b""
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            break
+        data = rest + data
+        cut = max(data.rfind(bytes([ws])) for ws in WHITESPACE)
+        if cut < 0:
+            rest = data  # One very long word, keep reading
+            continue
+        rest = data[cut + 1:]
+        yield data[:cut + 1]
+    if rest:
+        yield rest
+
+
+def analyze_stream(stream, chunk_size=CHUNK_SIZE):
+    """Count (letters, words, sentences) of a whole binary stream in a single pass."""
+    letters = words = sentences = 0
+    for chunk in iter_chunks(stream, chunk_size):
+        l, w, s = count_chunk(chunk)
+        letters += l
+        words += w
+        sentences += s
+    return letters, words, sentences
+
+
+def iter_blocks(stream, block, chunk_size=CHUNK_SIZE):
+    """
+    Yield (letters, words, sentences) for every `block` words of a stream.
+
+    The blocks do not overlap; the last one may be shorter.
+    """
+    letters = words = sentences = 0
+    for chunk in iter_chunks(stream, chunk_size):
+        parts = chunk.split()
+        start = 0
+        while len(parts) - start >= block - words:
+            # This chunk finishes the current block
+            end = start + block - words
+            l, w, s = count_chunk(b" ".join(parts[start:end]))
+            yield letters + l, words + w, sentences + s
+            letters = words = sentences = 0
+            start = end
+        l, w, s = count_chunk(b" ".join(parts[start:]))
+        letters += l
+        words += w
+        sentences += s
+    if words:
+        yield letters, words, sentences
+
+
+def iter_windows(stream, window, step=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield (letters, words, sentences) of a rolling window of `window` words.
+
+    A new window starts every `step` words (1 <= step <= window), so
+    windows overlap unless step == window, the default. The last window
+    always ends at the end of the text and may be shorter.
+    """
+    step = step or window
+    # Count blocks of gcd(window, step) words once, then slide over them
+    block = gcd(window, step)
+    per_window, per_step = window // block, step // block
+    blocks = deque()
+    letters = words = sentences = 0
+    seen = 0
+    for l, w, s in iter_blocks(stream, block, chunk_size):
+        blocks.append((l, w, s))
+        letters += l
+        words += w
+        sentences += s
+        if len(blocks) > per_window:
+            l, w, s = blocks.popleft()
+            letters -= l
+            words -= w
+            sentences -= s
+        seen += 1
+        if seen >= per_window and (seen - per_window) % per_step == 0:
+            yield letters, words, sentences
+    if seen and (seen < per_window or (seen - per_window) % per_step):
+        # Words after the last full step still get a window
+        yield letters, words, sentences
+
+
+def report(name, letters, words, sentences):
+    """Print the grade of one document or window."""
+    if words == 0:
+        print(f"{name}: no words")
+        return
+    grade = grade_label(coleman_liau(letters, words, sentences))
+    print(f"{name}: {grade} (letters {letters}, words {words}, sentences {sentences})")
+
+
+def score_files(paths, window=None, step=None):
+    """
+    Score each file ('-' is standard input), whole or per window of words.
+
+    A file that cannot be read gets an error message and the rest are
+    still scored; returns False if any file failed.
+    """
+    ok = True
+    for path in paths:
+        try:
+            stream = sys.stdin.buffer if path == "-" else open(path, "rb")
+            try:
+                if window:
+                    for number, counts in enumerate(iter_windows(stream, window, step), start=1):
+                        report(f"{path} [{number}]", *counts)
+                else:
+                    report(path, *analyze_stream(stream))
+            finally:
+                if stream is not sys.stdin.buffer:
+                    stream.close()
+        except OSError as exc:
+            print(f"Could not read {path}: {exc.strerror or exc}", file=sys.stderr)
+            ok = False
+    return ok
+
+
+def main():
+    # Score files (or '-' for standard input) when they are given
+    args = sys.argv[1:]
+    usage = "Usage: python readability.py [--window WORDS [--step WORDS]] FILE...\n" \
+            "  --window: grade every WORDS words; --step: start a new window every\n" \
+            "  this many words (default WORDS, so windows do not overlap)"
+    window = step = None
+    if args[:1] == ["--window"]:
+        if len(args) < 3 or not args[1].isdigit() or int(args[1]) < 1:
+            print(usage)
+            sys.exit(1)
+        window = int(args[1])
+        args = args[2:]
+        if args[:1] == ["--step"]:
+            if len(args) < 3 or not args[1].isdigit() or not 1 <= int(args[1]) <= window:
+                print(usage)
+                sys.exit(1)
+            step = int(args[1])
+            args = args[2:]
+    if args:
+        if not score_files(args, window, step):
+            sys.exit(1)
+        return
+
+    # Prompt user for input text
+    user_text = input("Text: ")
 
-# Calculate averages per 100 words
-avg_letters = (total_letters / total_words) * 100
-avg_sentences = (total_sentences / total_words) * 100
+    # Count letters, words, and sentences
+    total_letters = count_letters(user_text)
+    total_words = count_words(user_text)
+    total_sentences = count_sentences(user_text)
 
-# Coleman-Liau index calculation
-index = 0.0588 * avg_letters - 0.296 * avg_sentences - 15.8
-grade = round(index)
+    # Coleman-Liau index calculation, then display the grade level
+    index = coleman_liau(total_letters, total_words, total_sentences)
+    print(grade_label(index))
 
 
-if index < 1:
-    # Display the grade level
-    print("Before Grade 1")
-elif index > 16:
-    print("Grade 16+")
-else:
-    print(f"Grade {grade}")
+if __name__ == "__main__":
+    main()
 
 # Mohammadreza_mokhtari_kia
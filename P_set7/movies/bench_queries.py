@@ -0,0 +1,381 @@
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Equivalent forms of the numbered queries. Each must return the same rows
+# as the original (compared as a multiset, since ORDER BY ties may come
+# back in any order).
+REWRITES = {
+    4: {
+        "exists": """
+            SELECT COUNT(title) FROM movies
+            WHERE EXISTS (SELECT 1 FROM ratings WHERE ratings.movie_id = movies.id AND rating = 10.0)""",
+    },
+    6: {
+        "join": """
+            SELECT AVG(ratings.rating) FROM ratings JOIN movies ON movies.id = ratings.movie_id
+            WHERE movies.year = 2012""",
+        "exists": """
+            SELECT AVG(rating) FROM ratings
+            WHERE EXISTS (SELECT 1 FROM movies WHERE movies.id = ratings.movie_id AND year = 2012)""",
+    },
+    9: {
+        "join": """
+            SELECT name FROM (
+                SELECT DISTINCT people.id, people.name, people.birth
+                FROM people
+                JOIN stars ON stars.person_id = people.id
+                JOIN movies ON movies.id = stars.movie_id
+                WHERE movies.year = 2004)
+            ORDER BY birth""",
+        "exists": """
+            SELECT name FROM people
+            WHERE EXISTS (SELECT 1 FROM stars JOIN movies ON movies.id = stars.movie_id
+                          WHERE stars.person_id = people.id AND movies.year = 2004)
+            ORDER BY birth""",
+    },
+    10: {
+        "join": """
+            SELECT name FROM (
+                SELECT DISTINCT people.id, people.name
+                FROM people
+                JOIN directors ON directors.person_id = people.id
+                JOIN movies ON movies.id = directors.movie_id
+                JOIN ratings ON ratings.movie_id = movies.id
+                WHERE ratings.rating >= 9.0)""",
+        "exists": """
+            SELECT name FROM people
+            WHERE EXISTS (SELECT 1 FROM directors
+                          JOIN movies ON movies.id = directors.movie_id
+                          JOIN ratings ON ratings.movie_id = movies.id
+                          WHERE directors.person_id = people.id AND ratings.rating >= 9.0)""",
+        "cte": """
+            WITH top AS (SELECT movie_id FROM ratings WHERE rating >= 9.0),
+                 top_directors AS (SELECT DISTINCT directors.person_id FROM directors
+                                   JOIN movies ON movies.id = directors.movie_id
+                                   JOIN top ON top.movie_id = movies.id)
+            SELECT name FROM people JOIN top_directors ON top_directors.person_id = people.id""",
+    },
+    11: {
+        "exists": """
+            SELECT title FROM movies JOIN ratings ON movies.id = ratings.movie_id
+            WHERE EXISTS (SELECT 1 FROM stars JOIN people ON people.id = stars.person_id
+                          WHERE stars.movie_id = movies.id AND people.name LIKE 'chadwick Boseman')
+            ORDER BY rating DESC
+            LIMIT 5""",
+        "cte": """
+            WITH his_movies AS (SELECT DISTINCT stars.movie_id FROM stars
+                                JOIN people ON people.id = stars.person_id
+                                WHERE people.name LIKE 'chadwick Boseman')
+            SELECT title FROM movies
+            JOIN ratings ON movies.id = ratings.movie_id
+            JOIN his_movies ON his_movies.movie_id = movies.id
+            ORDER BY rating DESC
+            LIMIT 5""",
+    },
+    12: {
+        # INTERSECT compares titles, so a title counts if any movie of that
+        # title has each star; the rewrites keep that meaning
+        "join": """
+            SELECT movies.title FROM movies
+            JOIN stars ON stars.movie_id = movies.id
+            JOIN people ON people.id = stars.person_id
+            WHERE people.name IN ('Bradley Cooper', 'Jennifer Lawrence')
+            GROUP BY movies.title
+            HAVING COUNT(DISTINCT people.name) = 2""",
+        "exists": """
+            SELECT DISTINCT title FROM movies AS m
+            WHERE EXISTS (SELECT 1 FROM stars JOIN people ON people.id = stars.person_id
+                          WHERE stars.movie_id = m.id AND people.name = 'Bradley Cooper')
+              AND EXISTS (SELECT 1 FROM movies AS m2
+                          JOIN stars ON stars.movie_id = m2.id
+                          JOIN people ON people.id = stars.person_id
+                          WHERE m2.title = m.title AND people.name = 'Jennifer Lawrence')""",
+        "cte": """
+            WITH bradley AS (SELECT movies.title FROM movies
+                             JOIN stars ON stars.movie_id = movies.id
+                             JOIN people ON people.id = stars.person_id
+                             WHERE people.name = 'Bradley Cooper'),
+                 jennifer AS (SELECT movies.title FROM movies
+                              JOIN stars ON stars.movie_id = movies.id
+                              JOIN people ON people.id = stars.person_id
+                              WHERE people.name = 'Jennifer Lawrence')
+            SELECT title FROM bradley INTERSECT SELECT title FROM jennifer""",
+    },
+    13: {
+        "join": """
+            SELECT name FROM (
+                SELECT DISTINCT costar.id, costar.name
+                FROM people AS kevin
+                JOIN stars AS his ON his.person_id = kevin.id
+                JOIN stars AS theirs ON theirs.movie_id = his.movie_id
+                JOIN people AS costar ON costar.id = theirs.person_id
+                WHERE kevin.name = 'Kevin Bacon' AND kevin.birth = 1958
+                  AND costar.name != 'Kevin Bacon')""",
+        "exists": """
+            SELECT name FROM people
+            WHERE name != 'Kevin Bacon'
+              AND EXISTS (SELECT 1 FROM stars AS theirs
+                          JOIN stars AS his ON his.movie_id = theirs.movie_id
+                          JOIN people AS kevin ON kevin.id = his.person_id
+                          WHERE theirs.person_id = people.id
+                            AND kevin.name = 'Kevin Bacon' AND kevin.birth = 1958)""",
+        "cte": """
+            WITH kevin AS (SELECT id FROM people WHERE name = 'Kevin Bacon' AND birth = 1958),
+                 his_movies AS (SELECT DISTINCT movie_id FROM stars JOIN kevin ON kevin.id = stars.person_id),
+                 costars AS (SELECT DISTINCT person_id FROM stars JOIN his_movies USING (movie_id))
+            SELECT name FROM people JOIN costars ON costars.person_id = people.id
+            WHERE name != 'Kevin Bacon'""",
+    },
+}
+
+# Indexes --indexed adds to a synthetic database (the ones query_advisor.py tends to suggest)
+INDEXES = [
+    "CREATE INDEX stars_person ON stars (person_id, movie_id)",
+    "CREATE INDEX stars_movie ON stars (movie_id, person_id)",
+    "CREATE INDEX directors_person ON directors (person_id, movie_id)",
+    "CREATE INDEX directors_movie ON directors (movie_id, person_id)",
+    "CREATE INDEX ratings_movie ON ratings (movie_id, rating)",
+    "CREATE INDEX people_name ON people (name COLLATE NOCASE)",
+    "CREATE INDEX movies_year ON movies (year)",
+    "CREATE INDEX movies_title ON movies (title)",
+]
+
+# People and titles the queries ask about, planted in synthetic databases
+NAMED_PEOPLE = [
+    ("Kevin Bacon", 1958), ("Bradley Cooper", 1975), ("Jennifer Lawrence", 1990),
+    ("Chadwick Boseman", 1976), ("Emma Stone", 1988),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the movies.db queries and their JOIN/EXISTS/CTE rewrites.")
+    parser.add_argument("--db", default=os.path.join(HERE, "movies.db"), help="database to query (default: movies.db)")
+    parser.add_argument("--synthetic", type=float, metavar="SCALE",
+                        help="query a generated database instead, SCALE times a 10,000-movie base")
+    parser.add_argument("--indexed", action="store_true", help="add common indexes to the generated database")
+    parser.add_argument("--keep-synthetic", metavar="PATH", help="where to keep the generated database")
+    parser.add_argument("--queries", default="1-13", help="query numbers, e.g. 10,12-13 (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per form; the fastest counts")
+    parser.add_argument("--timeout", type=float, default=10.0,
+                        help="seconds one run of a form may take before it is given up (default: 10)")
+    parser.add_argument("--reference", metavar="DIR", help="compare each original query with DIR/N.txt")
+    parser.add_argument("--write-reference", metavar="DIR", help="save each original query's output to DIR/N.txt")
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--baseline", help="earlier --output file; report forms that got slower")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="slowdown factor counted as a regression")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = args.db
+        if args.synthetic:
+            db = args.keep_synthetic or os.path.join(tmp, "movies.db")
+            make_synthetic(db, args.synthetic, indexed=args.indexed)
+        if not os.path.isfile(db):
+            print(f"No database at {db} (movies.db is not in the repository; try --synthetic 1)")
+            sys.exit(1)
+        results = run(db, parse_numbers(args.queries), args)
+
+    # A rewrite that timed out is only slow; one that returned other rows is wrong
+    failed = any(not form["matches"] and not form["timed_out"]
+                 for result in results for form in result["forms"].values())
+    report = {"database": args.db if not args.synthetic else f"synthetic x{args.synthetic}", "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        failed |= check_baseline(results, args.baseline, args.tolerance)
+    sys.exit(1 if failed else 0)
+
+
+def parse_numbers(text):
+    """Turn '1,3-5' into [1, 3, 4, 5]."""
+    numbers = []
+    for part in text.split(","):
+        first, _, last = part.partition("-")
+        numbers.extend(range(int(first), int(last or first) + 1))
+    return numbers
+
+
+def normalized(rows):
+    """Rows as a sorted list, with floats rounded so summing order does not matter."""
+    rows = [tuple(round(v, 9) if isinstance(v, float) else v for v in row) for row in rows]
+    return sorted(rows, key=repr)
+
+
+def as_text(rows):
+    """Rows the way the sqlite3 shell prints them: columns joined with '|'."""
+    return "".join("|".join("" if v is None else str(v) for v in row) + "\n" for row in rows)
+
+
+def time_form(connection, sql, repeat, timeout):
+    """
+    Fastest of `repeat` runs; returns (seconds, rows).
+
+    A run taking longer than `timeout` seconds is interrupted (correlated
+    subqueries over unindexed tables can take hours); rows is then None.
+    """
+    best, rows = None, None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        deadline = start + timeout
+        connection.set_progress_handler(lambda: time.perf_counter() > deadline, 100_000)
+        try:
+            rows = connection.execute(sql).fetchall()
+        except sqlite3.OperationalError as exc:
+            if "interrupted" not in str(exc):
+                raise
+            return time.perf_counter() - start, None
+        finally:
+            connection.set_progress_handler(None, 0)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, rows
+
+
+def timing(seconds, rows, matches):
+    """One form's entry in the results."""
+    return {
+        "ms": round(seconds * 1e3, 3),
+        "rows": None if rows is None else len(rows),
+        "matches": rows is not None and matches,
+        "timed_out": rows is None,
+    }
+
+
+def run(db, numbers, args):
+    """Time every form of every query, check the outputs and print a table."""
+    connection = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+    results = []
+    for number in numbers:
+        with open(os.path.join(HERE, f"{number}.sql")) as f:
+            original = f.read()
+        forms = {"original": original, **REWRITES.get(number, {})}
+
+        seconds, rows = time_form(connection, original, args.repeat, args.timeout)
+        if rows is None:
+            print(f"{number:>2}.sql  original took over {args.timeout} s; skipped")
+            results.append({"query": number, "fastest": None, "forms": {"original": timing(seconds, rows, False)}})
+            continue
+        reference = normalized(rows)
+        reference_ok = True
+        if args.write_reference:
+            os.makedirs(args.write_reference, exist_ok=True)
+            with open(os.path.join(args.write_reference, f"{number}.txt"), "w") as f:
+                f.write(as_text(rows))
+        if args.reference:
+            with open(os.path.join(args.reference, f"{number}.txt")) as f:
+                reference_ok = sorted(f.read().splitlines()) == sorted(as_text(rows).splitlines())
+
+        timings = {"original": timing(seconds, rows, reference_ok)}
+        for name, sql in forms.items():
+            if name == "original":
+                continue
+            seconds, rows = time_form(connection, sql, args.repeat, args.timeout)
+            timings[name] = timing(seconds, rows, rows is not None and normalized(rows) == reference)
+        fastest = min((form for form in timings if timings[form]["matches"]), key=lambda f: timings[f]["ms"],
+                      default="original")
+        results.append({"query": number, "fastest": fastest, "forms": timings})
+
+        cells = "  ".join(
+            f"{name} " + (f">{args.timeout:g} s" if t["timed_out"] else f"{t['ms']:.2f} ms")
+            + ("" if t["matches"] or t["timed_out"] else " WRONG")
+            for name, t in timings.items()
+        )
+        print(f"{number:>2}.sql  fastest: {fastest:<8}  {cells}")
+    connection.close()
+    return results
+
+
+def check_baseline(results, path, tolerance):
+    """Print forms that got slower than in an earlier run; return True if any did."""
+    with open(path) as f:
+        before = {r["query"]: r["forms"] for r in json.load(f)["results"]}
+    slower = False
+    for result in results:
+        for name, form in result["forms"].items():
+            old = before.get(result["query"], {}).get(name)
+            if not old or form["timed_out"] or old["timed_out"]:
+                continue
+            if old["ms"] > 0 and form["ms"] > old["ms"] * tolerance:
+                print(f"REGRESSION {result['query']}.sql {name}: {old['ms']:.2f} ms -> {form['ms']:.2f} ms")
+                slower = True
+    return slower
+
+
+def make_synthetic(path, scale, indexed=False, seed=50):
+    """
+    Write a movies.db look-alike (same tables) of 10,000 * scale movies.
+
+    Every movie gets a rating (most of them), a director and four stars;
+    the people and titles the queries look for are planted, and Kevin
+    Bacon, Bradley Cooper and Jennifer Lawrence share some movies.
+    indexed: Also create INDEXES, to time the forms with indexes in place
+    """
+    rng = random.Random(seed)
+    n_movies = max(100, int(10_000 * scale))
+    n_people = n_movies * 2
+    if os.path.exists(path):
+        os.remove(path)
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        CREATE TABLE movies (id INTEGER, title TEXT NOT NULL, year NUMERIC, PRIMARY KEY(id));
+        CREATE TABLE stars (movie_id INTEGER NOT NULL, person_id INTEGER NOT NULL,
+                            FOREIGN KEY(movie_id) REFERENCES movies(id), FOREIGN KEY(person_id) REFERENCES people(id));
+        CREATE TABLE directors (movie_id INTEGER NOT NULL, person_id INTEGER NOT NULL,
+                                FOREIGN KEY(movie_id) REFERENCES movies(id), FOREIGN KEY(person_id) REFERENCES people(id));
+        CREATE TABLE ratings (movie_id INTEGER NOT NULL, rating REAL NOT NULL, votes INTEGER NOT NULL,
+                              FOREIGN KEY(movie_id) REFERENCES movies(id));
+        CREATE TABLE people (id INTEGER, name TEXT NOT NULL, birth NUMERIC, PRIMARY KEY(id));
+    """)
+    people = [(i, f"Person {i}", rng.randint(1920, 2005)) for i in range(1, n_people + 1)]
+    named = {name: n_people + i for i, (name, _) in enumerate(NAMED_PEOPLE, start=1)}
+    people += [(named[name], name, birth) for name, birth in NAMED_PEOPLE]
+    connection.executemany("INSERT INTO people VALUES (?, ?, ?)", people)
+
+    titles = {5: "Toy Story"}
+    titles.update({i: f"Harry Potter and Part {i}" for i in range(11, n_movies, max(1, n_movies // 8))})
+    connection.executemany(
+        "INSERT INTO movies VALUES (?, ?, ?)",
+        ((i, titles.get(i, f"Movie {i}"), rng.randint(1990, 2024)) for i in range(1, n_movies + 1)),
+    )
+
+    stars = []
+    everyone = list(range(1, n_people + 1))
+    for movie in range(1, n_movies + 1):
+        for person in rng.sample(everyone, 4):
+            stars.append((movie, person))
+    for name, person in named.items():
+        for movie in rng.sample(range(1, n_movies + 1), 20):
+            stars.append((movie, person))
+    for movie in rng.sample(range(1, n_movies + 1), 3):  # Shared movies
+        stars += [(movie, named["Bradley Cooper"]), (movie, named["Jennifer Lawrence"]), (movie, named["Kevin Bacon"])]
+    connection.executemany("INSERT INTO stars VALUES (?, ?)", stars)
+    connection.executemany(
+        "INSERT INTO directors VALUES (?, ?)",
+        ((movie, rng.randint(1, n_people)) for movie in range(1, n_movies + 1)),
+    )
+    connection.executemany(
+        "INSERT INTO ratings VALUES (?, ?, ?)",
+        ((movie, round(rng.uniform(1, 10), 1), rng.randint(5, 100_000))
+         for movie in range(1, n_movies + 1) if rng.random() < 0.8),
+    )
+    if indexed:
+        for create in INDEXES:
+            connection.execute(create)
+        connection.execute("ANALYZE")
+    connection.commit()
+    connection.close()
+
+
+if __name__ == "__main__":
+    main()
+
+# Mohammadreza_mokhtari_kia
@@ -0,0 +1,319 @@
+import argparse
+import os
+import sqlite3
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+MAGIC = b"STARGRF1"  # First bytes of a saved graph file
+
+
+class StarGraph:
+    """
+    Who starred in what, from the stars table, as compact CSR arrays.
+
+    People and movies get dense indexes 0..n-1 (person_ids[i] and
+    movie_ids[i] hold their ids in movies.db, sorted so an id is found by
+    binary search). The movies of person i are
+    person_movies[person_offsets[i]:person_offsets[i + 1]], and the
+    people of movie j are movie_people[movie_offsets[j]:movie_offsets[j + 1]].
+    Built once from the database (about one pass over stars), then saved
+    next to it, so later queries never touch SQL.
+    """
+
+    ARRAYS = ("person_ids", "movie_ids", "person_offsets", "person_movies", "movie_offsets", "movie_people")
+
+    def __init__(self, person_ids, movie_ids, person_offsets, person_movies, movie_offsets, movie_people):
+        self.person_ids = person_ids
+        self.movie_ids = movie_ids
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+
+    @classmethod
+    def from_db(cls, db):
+        """Build the graph from the stars table of a database."""
+        connection = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+        pairs = connection.execute("SELECT person_id, movie_id FROM stars")
+        people, movies = array("q"), array("q")
+        for person, movie in pairs:
+            people.append(person)
+            movies.append(movie)
+        connection.close()
+
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        if np is not None:
+            return cls(*cls._build_numpy(np, people, movies))
+
+        person_ids = array("q", sorted(set(people)))
+        movie_ids = array("q", sorted(set(movies)))
+        person_index = {p: i for i, p in enumerate(person_ids)}
+        movie_index = {m: i for i, m in enumerate(movie_ids)}
+        people = array("l", map(person_index.__getitem__, people))
+        movies = array("l", map(movie_index.__getitem__, movies))
+        person_offsets, person_movies = csr(len(person_ids), people, movies)
+        movie_offsets, movie_people = csr(len(movie_ids), movies, people)
+        return cls(person_ids, movie_ids, person_offsets, person_movies, movie_offsets, movie_people)
+
+    @staticmethod
+    def _build_numpy(np, people, movies):
+        """Same arrays as from_db, built with NumPy sorts instead of Python loops."""
+        people = np.frombuffer(people, dtype=np.int64)
+        movies = np.frombuffer(movies, dtype=np.int64)
+        person_ids, people = np.unique(people, return_inverse=True)
+        movie_ids, movies = np.unique(movies, return_inverse=True)
+        arrays = [person_ids, movie_ids]
+        for rows, cols, n in ((people, movies, len(person_ids)), (movies, people, len(movie_ids))):
+            order = np.argsort(rows, kind="stable")
+            offsets = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(rows, minlength=n), out=offsets[1:])
+            arrays += [offsets, cols[order]]
+        # Back to plain arrays, so the graph works the same with or without NumPy
+        return [array("q", a.astype(np.int64).tobytes()) if i < 2 else array("l", a.astype("l").tobytes())
+                for i, a in enumerate(arrays)]
+
+    def save(self, path):
+        """Write the arrays to a file that load() reads back."""
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<6q", *(len(getattr(self, name)) for name in self.ARRAYS)))
+            f.write(struct.pack("<B", array("l").itemsize))
+            for name in self.ARRAYS:
+                getattr(self, name).tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        """Read a graph written by save()."""
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a saved star graph")
+            sizes = struct.unpack("<6q", f.read(48))
+            if struct.unpack("<B", f.read(1))[0] != array("l").itemsize:
+                raise ValueError(f"{path} was saved on a machine with another word size")
+            arrays = []
+            for name, size in zip(cls.ARRAYS, sizes):
+                a = array("q" if name.endswith("_ids") else "l")
+                a.fromfile(f, size)
+                arrays.append(a)
+        return cls(*arrays)
+
+    @classmethod
+    def open(cls, db, cache=None):
+        """The graph of a database: loaded from `cache` (default db + '.graph') if it is newer than db, else built and saved."""
+        cache = cache or db + ".graph"
+        if os.path.isfile(cache) and os.path.getmtime(cache) >= os.path.getmtime(db):
+            try:
+                return cls.load(cache)
+            except (ValueError, EOFError):
+                pass  # Rebuild a damaged or foreign file
+        graph = cls.from_db(db)
+        graph.save(cache)
+        return graph
+
+    def _person(self, person_id):
+        """Dense index of a person id; KeyError if they never starred in anything."""
+        i = bisect_left(self.person_ids, person_id)
+        if i == len(self.person_ids) or self.person_ids[i] != person_id:
+            raise KeyError(person_id)
+        return i
+
+    def movies_of(self, person_id):
+        """Ids of the movies a person starred in."""
+        po, pm, ids = self.person_offsets, self.person_movies, self.movie_ids
+        i = self._person(person_id)
+        return [ids[m] for m in pm[po[i]:po[i + 1]]]
+
+    def costars(self, person_id):
+        """Ids of everyone who starred in a movie with the person (not the person)."""
+        po, pm, mo, mp = self.person_offsets, self.person_movies, self.movie_offsets, self.movie_people
+        i = self._person(person_id)
+        found = set()
+        for m in pm[po[i]:po[i + 1]]:
+            found.update(mp[mo[m]:mo[m + 1]])
+        found.discard(i)
+        return {self.person_ids[p] for p in found}
+
+    def within(self, person_id, degrees):
+        """Map every person at most `degrees` co-star steps away to their distance (1 = co-star)."""
+        po, pm, mo, mp = self.person_offsets, self.person_movies, self.movie_offsets, self.movie_people
+        start = self._person(person_id)
+        distance = {start: 0}
+        seen_movies = set()
+        frontier = [start]
+        for degree in range(1, degrees + 1):
+            following = []
+            for p in frontier:
+                for m in pm[po[p]:po[p + 1]]:
+                    if m in seen_movies:
+                        continue
+                    seen_movies.add(m)
+                    for q in mp[mo[m]:mo[m + 1]]:
+                        if q not in distance:
+                            distance[q] = degree
+                            following.append(q)
+            if not following:
+                break
+            frontier = following
+        del distance[start]
+        return {self.person_ids[p]: d for p, d in distance.items()}
+
+    def path(self, source_id, target_id, max_degrees=None):
+        """
+        A shortest chain of shared movies between two people, found with
+        a bidirectional breadth-first search.
+
+        Returns [person, movie, person, movie, ..., person] ids (its
+        number of movies is the degrees of separation), or None if they
+        are not connected within max_degrees.
+        """
+        po, pm, mo, mp = self.person_offsets, self.person_movies, self.movie_offsets, self.movie_people
+        source, target = self._person(source_id), self._person(target_id)
+        if source == target:
+            return [source_id]
+
+        # Per side: person -> (previous person, shared movie, distance from that side)
+        parents = ({source: (None, None, 0)}, {target: (None, None, 0)})
+        frontiers = [[source], [target]]
+        seen_movies = (set(), set())
+        depths = [0, 0]
+        while frontiers[0] and frontiers[1]:
+            if max_degrees is not None and depths[0] + depths[1] >= max_degrees:
+                return None
+            # Grow the smaller side by one whole level
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            mine, other, seen = parents[side], parents[1 - side], seen_movies[side]
+            depth = depths[side] + 1
+            following, meeting = [], None
+            for p in frontiers[side]:
+                for m in pm[po[p]:po[p + 1]]:
+                    if m in seen:
+                        continue
+                    seen.add(m)
+                    for q in mp[mo[m]:mo[m + 1]]:
+                        if q in mine:
+                            continue
+                        mine[q] = (p, m, depth)
+                        following.append(q)
+                        # Of all meetings on this level, keep the one closest to the other side
+                        if q in other and (meeting is None or other[q][2] < other[meeting][2]):
+                            meeting = q
+            if meeting is not None:
+                return self._join(parents, meeting, side)
+            frontiers[side] = following
+            depths[side] = depth
+        return None
+
+    def _join(self, parents, meeting, side):
+        """Turn the two parent maps and their meeting person into a path of ids."""
+        halves = []
+        for parent in (parents[side], parents[1 - side]):
+            chain, p = [], meeting
+            while parent[p][0] is not None:
+                before, movie, _ = parent[p]
+                chain += [self.movie_ids[movie], self.person_ids[before]]
+                p = before
+            halves.append(chain)
+        forward = halves[0][::-1] + [self.person_ids[meeting]] + halves[1]
+        return forward if side == 0 else forward[::-1]
+
+    def separation(self, source_id, target_id, max_degrees=None):
+        """Degrees of separation between two people, or None if they are not connected."""
+        chain = self.path(source_id, target_id, max_degrees)
+        return None if chain is None else len(chain) // 2
+
+
+def csr(n, rows, cols):
+    """Counting sort of (row, col) pairs into CSR offsets and column arrays."""
+    offsets = array("l", bytes(array("l").itemsize * (n + 1)))
+    for r in rows:
+        offsets[r + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+    slots = array("l", offsets[:-1])
+    columns = array("l", bytes(array("l").itemsize * len(cols)))
+    for r, c in zip(rows, cols):
+        columns[slots[r]] = c
+        slots[r] += 1
+    return offsets, columns
+
+
+def find_person(connection, name, birth=None):
+    """Id of the one person with this name (and birth year); exits with a message if there are none or several."""
+    sql, args = "SELECT id, birth FROM people WHERE name = ?", [name]
+    if birth is not None:
+        sql, args = sql + " AND birth = ?", args + [birth]
+    rows = connection.execute(sql, args).fetchall()
+    if len(rows) != 1:
+        found = ", ".join(f"id {i} (born {b})" for i, b in rows) or "nobody"
+        print(f"{name!r} must match one person (use --birth); found {found}")
+        sys.exit(1)
+    return rows[0][0]
+
+
+def names(connection, table, column, ids):
+    """Map ids to names or titles, looked up in batches."""
+    ids, found = list(ids), {}
+    for start in range(0, len(ids), 900):  # Stay under SQLite's parameter limit
+        chunk = ids[start:start + 900]
+        marks = ",".join("?" * len(chunk))
+        found.update(connection.execute(f"SELECT id, {column} FROM {table} WHERE id IN ({marks})", chunk))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Co-stars and degrees of separation from movies.db.")
+    parser.add_argument("person", help="name of a person, e.g. 'Kevin Bacon'")
+    parser.add_argument("target", nargs="?", help="second person: print how they are connected")
+    parser.add_argument("--birth", type=int, help="birth year of the first person, if the name is shared")
+    parser.add_argument("--target-birth", type=int, help="birth year of the second person")
+    parser.add_argument("--degrees", type=int, default=1, help="list everyone this many steps away (default: 1)")
+    parser.add_argument("--db", default=os.path.join(HERE, "movies.db"), help="database (default: movies.db)")
+    parser.add_argument("--cache", help="graph file (default: the database path + '.graph')")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.db):
+        print(f"No database at {args.db}")
+        sys.exit(1)
+    connection = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    source = find_person(connection, args.person, args.birth)
+
+    start = time.perf_counter()
+    graph = StarGraph.open(args.db, args.cache)
+    loaded = time.perf_counter()
+    try:
+        if args.target:
+            target = find_person(connection, args.target, args.target_birth)
+            chain = graph.path(source, target)
+            answered = time.perf_counter()
+            if chain is None:
+                print("Not connected.")
+            else:
+                people = names(connection, "people", "name", chain[0::2])
+                titles = names(connection, "movies", "title", chain[1::2])
+                print(f"{len(chain) // 2} degrees of separation.")
+                for i in range(1, len(chain), 2):
+                    print(f"{people[chain[i - 1]]} and {people[chain[i + 1]]} starred in {titles[chain[i]]}")
+        else:
+            found = graph.costars(source) if args.degrees == 1 else graph.within(source, args.degrees)
+            answered = time.perf_counter()
+            # Like 13.sql: one line per person, other people with the same name left out
+            people = names(connection, "people", "name", found)
+            sys.stdout.write("".join(f"{name}\n" for name in people.values() if name != args.person))
+    except KeyError:
+        print("That person has not starred in any movie.")
+        sys.exit(1)
+    print(f"graph: {(loaded - start) * 1e3:.1f} ms, query: {(answered - loaded) * 1e3:.2f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
+
+# Mohammadreza_mokhtari_kia
@@ -0,0 +1,296 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# The problem-set workloads: database and query files
+WORKLOADS = {
+    "movies": ("movies/movies.db", [f"movies/{n}.sql" for n in range(1, 14)]),
+    "songs": ("songs/songs.db", [f"songs/{n}.sql" for n in range(1, 9)]),
+    "fiftyville": ("fiftyville/fiftyville.db", ["fiftyville/log.sql"]),
+}
+
+# Operators that let an index jump straight to the matching rows ...
+EQUALITY = r"(?:==|=|\bin\b|\bis\b)"
+# ... and the ones that let it read a range of rows
+RANGE = r"(?:<=|>=|<|>|\bbetween\b|\blike\b)"
+
+# A query counts as faster with the new indexes if it takes less than this share of its old time
+FASTER = 0.9
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile query plans and suggest indexes.")
+    parser.add_argument("workloads", nargs="*", default=list(WORKLOADS),
+                        help=f"built-in workloads to run ({', '.join(WORKLOADS)}; default: all)")
+    parser.add_argument("--db", help="run SQL files against this database instead of a built-in workload")
+    parser.add_argument("--sql", nargs="+", default=[], help="query files for --db")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per query; the fastest counts")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    if args.db:
+        jobs = [(args.db, args.sql)]
+    else:
+        jobs = []
+        for name in args.workloads:
+            if name not in WORKLOADS:
+                print(f"Unknown workload: {name}")
+                sys.exit(1)
+            db, files = WORKLOADS[name]
+            jobs.append((os.path.join(HERE, db), [os.path.join(HERE, f) for f in files]))
+
+    reports = []
+    for db, files in jobs:
+        if not os.path.isfile(db):
+            print(f"Skipping {db}: database not found", file=sys.stderr)
+            continue
+        reports.append(advise(db, files, args.repeat))
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        for report in reports:
+            print_report(report)
+
+
+def read_statements(path):
+    """Split a .sql file into its statements (the last one may lack a ';')."""
+    statements, buffer = [], ""
+    with open(path) as f:
+        for line in f:
+            buffer += line
+            if sqlite3.complete_statement(buffer):
+                statements.append(buffer.strip())
+                buffer = ""
+    # Whatever is left counts if it holds more than comments
+    if re.sub(r"--[^\n]*", "", buffer).strip():
+        statements.append(buffer.strip())
+    return [s for s in statements if re.sub(r"--[^\n]*", "", s).strip()]
+
+
+def query_plan(connection, sql):
+    """Return the EXPLAIN QUERY PLAN detail lines of a statement."""
+    return [row[3] for row in connection.execute("EXPLAIN QUERY PLAN " + sql)]
+
+
+def full_scans(plan, names):
+    """
+    Tables the plan reads from start to end without an index.
+
+    names: Map of every table name and alias in the query to its table
+    """
+    scanned = []
+    for detail in plan:
+        match = re.match(r"SCAN (\w+)$", detail)
+        if match and match.group(1) in names:
+            scanned.append(names[match.group(1)])
+    return scanned
+
+
+def time_query(connection, sql, repeat):
+    """Run a statement `repeat` times; return (fastest seconds, sorted result rows)."""
+    best, rows = None, None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        rows = connection.execute(sql).fetchall()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    # Sums like avg() may differ in the last digits when rows come in another order
+    rows = [tuple(round(v, 9) if isinstance(v, float) else v for v in row) for row in rows]
+    return best, sorted(rows, key=repr)
+
+
+def table_columns(connection):
+    """
+    Map every table to the columns an index could help with.
+
+    An INTEGER PRIMARY KEY column is left out: it is the rowid itself, so
+    lookups on it never need an index and every index already holds it.
+    """
+    tables = [row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    columns = {}
+    for t in tables:
+        info = list(connection.execute(f"PRAGMA table_info({t})"))
+        keys = [row for row in info if row[5]]
+        alias = keys[0][1] if len(keys) == 1 and keys[0][2].upper() == "INTEGER" else None
+        columns[t] = [row[1] for row in info if row[1] != alias]
+    return columns
+
+
+def aliases(sql, table):
+    """Names a table goes by in a query: itself plus any 'table alias' / 'table AS alias'."""
+    names = {table}
+    for match in re.finditer(rf"\b{table}\s+(?:as\s+)?(\w+)", sql, re.IGNORECASE):
+        word = match.group(1).lower()
+        if word not in ("where", "join", "on", "group", "order", "limit", "inner", "left", "cross",
+                        "natural", "union", "intersect", "except", "using"):
+            names.add(match.group(1))
+    return names
+
+
+def suggest_indexes(sql, table, columns):
+    """
+    Propose indexes for a fully scanned table.
+
+    Each column compared for equality (=, IN, joins) leads one index,
+    followed by the table's other equality columns, then one range or
+    LIKE column, then other columns the query reads so the index may
+    cover it (at most four columns). A table with only range filters
+    gets an index led by each of them. LIKE columns get COLLATE NOCASE,
+    which SQLite needs before LIKE can use an index.
+    Returns (name, CREATE INDEX statement, column parts) tuples.
+    """
+    names = "|".join(re.escape(a) for a in aliases(sql, table))
+    used, equal, ranged, liked = [], [], [], set()
+    for column in columns:
+        ref = rf"(?:\b(?:{names})\.)?\b{re.escape(column)}\b"
+        if not re.search(ref, sql, re.IGNORECASE):
+            continue
+        used.append(column)
+        if re.search(rf"{ref}\s*{EQUALITY}|(?:==|=)\s*{ref}", sql, re.IGNORECASE):
+            equal.append(column)
+        elif re.search(rf"{ref}\s*{RANGE}|{RANGE}\s*{ref}", sql, re.IGNORECASE):
+            ranged.append(column)
+        if re.search(rf"{ref}\s+like\b", sql, re.IGNORECASE):
+            liked.add(column)
+
+    layouts = []
+    for lead in equal or ranged:
+        cols = [lead] + [c for c in equal if c != lead]
+        cols += [c for c in ranged if c not in cols][:1]
+        cols += [c for c in used if c not in cols]
+        layouts.append(cols[:4])
+
+    suggestions = []
+    for cols in layouts:
+        parts = [f"{c} COLLATE NOCASE" if c in liked else c for c in cols]
+        name = f"advise_{table}_{'_'.join(cols)}"
+        suggestions.append((name, f"CREATE INDEX {name} ON {table} ({', '.join(parts)})", tuple(parts)))
+    return suggestions
+
+
+def drop_prefixes(suggestions):
+    """
+    Map each suggested index name to the one to build instead: itself, or
+    a longer suggestion on the same table that starts with the same
+    columns and so serves the same lookups.
+
+    suggestions: (name, table, column parts) tuples
+    """
+    chosen = {}
+    for name, table, parts in suggestions:
+        longer = [(len(p), n) for n, t, p in suggestions
+                  if t == table and len(p) > len(parts) and p[:len(parts)] == parts]
+        chosen[name] = max(longer)[1] if longer else name
+    return chosen
+
+
+def advise(db, files, repeat):
+    """Profile every statement, try the suggested indexes on a scratch copy and compare."""
+    source = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+    columns = table_columns(source)
+
+    queries = []
+    for path in files:
+        for number, sql in enumerate(read_statements(path), start=1):
+            plan = query_plan(source, sql)
+            seconds, rows = time_query(source, sql, repeat)
+            names = {alias: table for table in columns for alias in aliases(sql, table)}
+            scans = full_scans(plan, names)
+            suggestions = []
+            for table in dict.fromkeys(scans):
+                suggestions += [(name, create, table, parts)
+                                for name, create, parts in suggest_indexes(sql, table, columns[table])]
+            queries.append({
+                "file": os.path.relpath(path, HERE),
+                "statement": number,
+                "sql": sql,
+                "plan_before": plan,
+                "full_scans": scans,
+                "ms_before": round(seconds * 1e3, 3),
+                "suggested": [],
+                "_rows": rows,
+                "_suggestions": suggestions,
+            })
+
+    # A suggestion that is a leading prefix of a longer one on the same table is
+    # replaced by the longer one, which serves the same lookups
+    statements = {name: create for q in queries for name, create, _, _ in q["_suggestions"]}
+    chosen = drop_prefixes(list({(name, table, parts) for q in queries
+                                 for name, _, table, parts in q["_suggestions"]}))
+    for query in queries:
+        query["_names"] = list(dict.fromkeys(chosen[name] for name, _, _, _ in query.pop("_suggestions")))
+        query["suggested"] = [statements[name] for name in query["_names"]]
+
+    # Build every distinct suggested index on a copy of the database
+    with tempfile.TemporaryDirectory() as tmp:
+        scratch_path = os.path.join(tmp, "scratch.db")
+        scratch = sqlite3.connect(scratch_path)
+        source.backup(scratch)
+        source.close()
+        created = {}
+        for query in queries:
+            for name, create in zip(query["_names"], query["suggested"]):
+                if name not in created:
+                    scratch.execute(create)
+                    created[name] = create
+        scratch.execute("ANALYZE")
+        scratch.commit()
+
+        helpful = set()
+        for query in queries:
+            plan = query_plan(scratch, query["sql"])
+            seconds, rows = time_query(scratch, query["sql"], repeat)
+            used = sorted(name for name in created if re.search(rf"\b{name}\b", " ".join(plan)))
+            same = rows == query.pop("_rows")
+            # Only indexes that made some query faster, without changing its result, are recommended
+            if same and seconds * 1e3 < query["ms_before"] * FASTER:
+                helpful.update(used)
+            query.update({
+                "plan_after": plan,
+                "ms_after": round(seconds * 1e3, 3),
+                "indexes_used": used,
+                "same_result": same,
+            })
+            query.pop("_names")
+        scratch.close()
+
+    return {
+        "database": db,
+        "queries": queries,
+        "recommended": [created[name] for name in sorted(helpful)],
+    }
+
+
+def print_report(report):
+    """Print a report for people."""
+    print(f"== {report['database']}")
+    for q in report["queries"]:
+        flag = f"  FULL SCAN: {', '.join(q['full_scans'])}" if q["full_scans"] else ""
+        if q["ms_after"] > q["ms_before"] / FASTER:
+            flag += "  SLOWER with the new indexes"
+        print(f"{q['file']} #{q['statement']}: {q['ms_before']:.3f} ms -> {q['ms_after']:.3f} ms{flag}")
+        for line in q["plan_before"]:
+            print(f"    before: {line}")
+        if q["indexes_used"]:
+            for line in q["plan_after"]:
+                print(f"    after:  {line}")
+        if not q["same_result"]:
+            print("    WARNING: results differ after adding indexes")
+    print("Recommended indexes:")
+    for create in report["recommended"] or ["(none)"]:
+        print(f"    {create};")
+    print()
+
+
+if __name__ == "__main__":
+    main()
+
+# Mohammadreza_mokhtari_kia
@@ -1,4 +1,11 @@
+import csv
+import io
+import json
 import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import date
 
 from cs50 import SQL
 from flask import Flask, flash, jsonify, redirect, render_template, request, session
@@ -12,38 +19,282 @@ app.config["TEMPLATES_AUTO_RELOAD"] = True
 # Configure CS50 Library to use SQLite database
 db = SQL("sqlite:///birthdays.db")
 
+# Index behind the (month, day) ordering, so pages and upcoming birthdays
+# are read in order from the index instead of sorting the whole table
+db.execute("CREATE INDEX IF NOT EXISTS birthdays_month_day ON birthdays (month, day, id)")
+
+# The same person and date can be saved only once. This is a one-time
+# migration: duplicates saved before the unique index existed are removed
+# (keeping the oldest copy) the first time the app starts, and reported
+if not db.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'birthdays_unique'"):
+    removed = db.execute("DELETE FROM birthdays WHERE id NOT IN (SELECT MIN(id) FROM birthdays GROUP BY name, month, day)")
+    if removed:
+        app.logger.warning("Removed %d duplicate birthdays before creating the unique index", removed)
+    db.execute("CREATE UNIQUE INDEX birthdays_unique ON birthdays (name, month, day)")
+
+# Version of the birthdays data, bumped by triggers on every insert, update
+# and delete (also ones made by another process or the sqlite3 shell)
+db.execute("CREATE TABLE IF NOT EXISTS birthdays_version (version INTEGER NOT NULL)")
+if not db.execute("SELECT 1 FROM birthdays_version"):
+    db.execute("INSERT INTO birthdays_version (version) VALUES (0)")
+for change in ("INSERT", "UPDATE", "DELETE"):
+    db.execute(
+        f"CREATE TRIGGER IF NOT EXISTS birthdays_version_{change.lower()} AFTER {change} ON birthdays "
+        "BEGIN UPDATE birthdays_version SET version = version + 1; END"
+    )
+
+PAGE_SIZE = 50       # Birthdays per page
+UPCOMING_COUNT = 5   # Birthdays shown under "Upcoming"
+CACHE_SIZE = 256     # Rendered pages kept in memory
+IMPORT_CHUNK = 10000 # Rows inserted per transaction by /import
+MAX_ERRORS = 20      # Invalid rows described in the /import answer
+
+# Days in each month (February 29 is allowed)
+DAYS_IN_MONTH = [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+# Rendered pages of the current data version, shared by the request threads
+page_cache = OrderedDict()
+page_cache_lock = threading.Lock()
+cached_version = None
+
+
+def data_version():
+    """Version of the birthdays data; changes on every write and costs one single-row read."""
+    return db.execute("SELECT version FROM birthdays_version")[0]["version"]
+
+
+def parse_cursor(text):
+    """Turn a 'month-day-id' cursor from the URL into a tuple, or None if it is missing or invalid."""
+    try:
+        month, day, row_id = (int(part) for part in text.split("-"))
+    except (AttributeError, ValueError):
+        return None
+    return month, day, row_id
+
+
+def valid_birthday(name, month, day):
+    """Return (name, month, day) cleaned up, or None if it is not a real birthday."""
+    name = str(name or "").strip()
+    try:
+        month = int(month)
+        day = int(day)
+    except (TypeError, ValueError):
+        return None
+    if not name or not 1 <= month <= 12 or not 1 <= day <= DAYS_IN_MONTH[month - 1]:
+        return None
+    return name, month, day
+
+
+def read_upload(upload):
+    """
+    Yield (line, record) pairs from an uploaded CSV or JSON file.
+
+    CSV needs name, month and day columns. JSON may be a list of objects
+    or one object per line (JSON Lines); only lists are read whole.
+    """
+    text = io.TextIOWrapper(upload.stream, encoding="utf-8-sig")
+    if not upload.filename.lower().endswith((".json", ".jsonl")):
+        for line, record in enumerate(csv.DictReader(text), start=2):
+            yield line, record
+        return
+    first = text.read(1)
+    while first.isspace():
+        first = text.read(1)
+    if first == "[":
+        for line, record in enumerate(json.loads(first + text.read()), start=1):
+            yield line, record
+        return
+    for line, row in enumerate(text, start=1):
+        row = (first + row) if line == 1 else row
+        if row.strip():
+            try:
+                yield line, json.loads(row)
+            except ValueError:
+                yield line, None
+
+
+def import_birthdays(records):
+    """
+    Validate records in one pass and insert them in chunked transactions.
+
+    Rows already saved are skipped by the unique index. If the file turns
+    out to be unreadable part way (a bad byte, broken CSV or JSON), the
+    rows read before that point are still saved and the summary says
+    where reading stopped ("stopped_at"); it is None for a complete file.
+    Returns a summary dict for the /import answer.
+    """
+    inserted = added = invalid = 0
+    errors = []
+    stopped_at = None
+    line = 0
+    connection = sqlite3.connect("birthdays.db")
+    try:
+        chunk = []
+        records = iter(records)
+        while True:
+            try:
+                line, record = next(records)
+            except StopIteration:
+                break
+            except (UnicodeDecodeError, ValueError, csv.Error) as exc:
+                stopped_at = {"after_line": line, "error": f"Could not read the file: {exc}"}
+                break
+            row = valid_birthday(record.get("name"), record.get("month"), record.get("day")) \
+                if isinstance(record, dict) else None
+            if row is None:
+                invalid += 1
+                if len(errors) < MAX_ERRORS:
+                    errors.append(f"Line {line}: expected a name, a month (1-12) and a valid day.")
+                continue
+            chunk.append(row)
+            if len(chunk) >= IMPORT_CHUNK:
+                with connection:  # One transaction per chunk
+                    # rowcount leaves out the version trigger's updates, unlike total_changes
+                    added += connection.executemany("INSERT OR IGNORE INTO birthdays (name, month, day) VALUES (?, ?, ?)", chunk).rowcount
+                inserted += len(chunk)
+                chunk = []
+        if chunk:
+            with connection:
+                added += connection.executemany("INSERT OR IGNORE INTO birthdays (name, month, day) VALUES (?, ?, ?)", chunk).rowcount
+            inserted += len(chunk)
+    finally:
+        connection.close()
+    return {
+        "inserted": added,
+        "duplicates": inserted - added,
+        "invalid": invalid,
+        "errors": errors,
+        "stopped_at": stopped_at,
+    }
+
+
+def cursor_of(row):
+    """Cursor pointing at a birthday row."""
+    return f"{row['month']}-{row['day']}-{row['id']}"
+
+
+def birthdays_page(after=None, before=None):
+    """
+    One page of birthdays in (month, day) order, found with keyset pagination.
+
+    Returns (rows, previous_cursor, next_cursor); a cursor is None when
+    there is no page in that direction.
+    """
+    if before:
+        # Walk the index backwards from the cursor, then put the rows back in order
+        rows = db.execute(
+            "SELECT id, name, month, day FROM birthdays WHERE (month, day, id) < (?, ?, ?) "
+            "ORDER BY month DESC, day DESC, id DESC LIMIT ?",
+            *before, PAGE_SIZE + 1
+        )
+        has_prev = len(rows) > PAGE_SIZE
+        rows = rows[:PAGE_SIZE][::-1]
+        has_next = True
+    else:
+        if after:
+            rows = db.execute(
+                "SELECT id, name, month, day FROM birthdays WHERE (month, day, id) > (?, ?, ?) "
+                "ORDER BY month, day, id LIMIT ?",
+                *after, PAGE_SIZE + 1
+            )
+        else:
+            rows = db.execute("SELECT id, name, month, day FROM birthdays ORDER BY month, day, id LIMIT ?", PAGE_SIZE + 1)
+        has_next = len(rows) > PAGE_SIZE
+        rows = rows[:PAGE_SIZE]
+        has_prev = after is not None
+    previous = cursor_of(rows[0]) if rows and has_prev else None
+    following = cursor_of(rows[-1]) if rows and has_next else None
+    return rows, previous, following
+
+
+def upcoming_birthdays(today, count=UPCOMING_COUNT):
+    """The next birthdays from today on, wrapping around to January; two short index range scans."""
+    rows = db.execute(
+        "SELECT id, name, month, day FROM birthdays WHERE (month, day) >= (?, ?) ORDER BY month, day, id LIMIT ?",
+        today.month, today.day, count
+    )
+    if len(rows) < count:
+        rows += db.execute(
+            "SELECT id, name, month, day FROM birthdays WHERE (month, day) < (?, ?) ORDER BY month, day, id LIMIT ?",
+            today.month, today.day, count - len(rows)
+        )
+    return rows
+
 
 @app.after_request
 def after_request(response):
-    """Ensure responses aren't cached"""
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    response.headers["Expires"] = 0
-    response.headers["Pragma"] = "no-cache"
+    """Let browsers keep pages, but make them check the ETag every time"""
+    response.headers["Cache-Control"] = "no-cache"
     return response
 
 
 @app.route("/", methods=["GET", "POST"])
 def index():
+    global cached_version
+
     if request.method == "POST":
         # Get information from the form
         name = request.form.get("name")
         month = request.form.get("month")
         day = request.form.get("day")
 
-        # If the user had entered all the values
-        if name and month and day:
+        # If the user had entered a real date (a birthday saved before is skipped)
+        row = valid_birthday(name, month, day)
+        if row:
             db.execute(
-                "INSERT INTO birthdays (name, month, day) VALUES (?, ?, ?)",
-                name, month, day
+                "INSERT OR IGNORE INTO birthdays (name, month, day) VALUES (?, ?, ?)",
+                *row
             )
 
         return redirect("/")
 
     else:
-        # Get all records from the database
-        birthdays = db.execute("SELECT * FROM birthdays")
+        after = parse_cursor(request.args.get("after"))
+        before = parse_cursor(request.args.get("before"))
+        today = date.today()
+
+        # Same data, same page and same day give the same page
+        version = data_version()
+        key = (version, after, before, today.isoformat())
+        etag = f"v{version}-{today.isoformat()}-" + "-".join("x" if c is None else "{}.{}.{}".format(*c) for c in key[1:3])
+        if request.if_none_match.contains(etag):
+            return "", 304, {"ETag": f'"{etag}"'}
+
+        with page_cache_lock:
+            if version != cached_version:
+                page_cache.clear()  # The data changed, every cached page is stale
+                cached_version = version
+            html = page_cache.get(key)
+        if html is None:
+            birthdays, previous, following = birthdays_page(after, before)
+            html = render_template(
+                "index.html",
+                birthdays=birthdays,
+                upcoming=upcoming_birthdays(today),
+                previous=previous,
+                following=following,
+            )
+            with page_cache_lock:
+                if version == cached_version:
+                    if len(page_cache) >= CACHE_SIZE:
+                        page_cache.popitem(last=False)  # Drop the oldest page
+                    page_cache[key] = html
+
+        return html, 200, {"ETag": f'"{etag}"'}
+
+@app.route("/import", methods=["POST"])
+def bulk_import():
+    """Add many birthdays from an uploaded CSV or JSON file"""
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        return jsonify({"error": "Upload a CSV or JSON file in the 'file' field."}), 400
+    summary = import_birthdays(read_upload(upload))
+    if summary["stopped_at"] and not (summary["inserted"] or summary["duplicates"] or summary["invalid"]):
+        # Nothing could be read at all
+        return jsonify({"error": summary["stopped_at"]["error"]}), 400
+    # A file that broke part way still answers 200: the rows before the break are saved, see "stopped_at"
+    return jsonify(summary)
 
-        return render_template("index.html", birthdays=birthdays)
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)